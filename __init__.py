@@ -1,3 +1,9 @@
 def classFactory(iface):
+    import time
+    started = time.perf_counter()
     from .digipin_encoder import DIGIPIN_ENCODER
-    return DIGIPIN_ENCODER(iface)
\ No newline at end of file
+    imported = time.perf_counter()
+    plugin = DIGIPIN_ENCODER(iface)
+    plugin.startup_timings['import'] = imported - started
+    plugin.startup_timings['__init__'] = time.perf_counter() - imported
+    return plugin
\ No newline at end of file
@@ -0,0 +1,93 @@
+# DIGIPIN ENCODER - A QGIS plugin for encoding and decoding DIGIPINs using India Post's API
+# Copyright (C) 2025 Beig Mehaboob
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from array import array
+
+from qgis.core import (QgsVectorLayer, QgsFeature, QgsField, QgsGeometry,
+                       QgsRectangle)
+from PyQt5.QtCore import QVariant
+
+from . import digipin_grid
+
+
+class CellAggregator:
+    """Count, sum and mean of numeric fields per DIGIPIN cell.
+
+    Cells are identified by packed keys of one level. Each cell gets a slot
+    the first time it is seen; the keys and statistics of all cells are kept
+    in flat typed arrays indexed by slot rather than in one object per cell.
+    """
+
+    def __init__(self, level, field_count):
+        self.level = level
+        self._slots = {}
+        self.keys = array('q')
+        self.counts = array('q')
+        self.sums = [array('d') for _ in range(field_count)]
+        self.value_counts = [array('q') for _ in range(field_count)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, values):
+        """Add one feature of the cell with packed key; values holds one number (or None) per field"""
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = len(self.keys)
+            self._slots[key] = slot
+            self.keys.append(key)
+            self.counts.append(0)
+            for sums, value_counts in zip(self.sums, self.value_counts):
+                sums.append(0.0)
+                value_counts.append(0)
+
+        self.counts[slot] += 1
+        for i, value in enumerate(values):
+            if value is not None:
+                self.sums[i][slot] += value
+                self.value_counts[i][slot] += 1
+
+    def mean(self, field_index, slot):
+        """Mean of a field in a cell over the features where it is not null, or None"""
+        count = self.value_counts[field_index][slot]
+        return self.sums[field_index][slot] / count if count else None
+
+
+def build_cell_layer(aggregator, field_names, name):
+    """Return a WGS84 memory layer with one cell polygon per aggregated cell"""
+    layer = QgsVectorLayer("Polygon?crs=EPSG:4326", name, "memory")
+    fields = [QgsField('digipin', QVariant.String), QgsField('count', QVariant.LongLong)]
+    for field_name in field_names:
+        fields.append(QgsField(f'{field_name}_sum', QVariant.Double))
+        fields.append(QgsField(f'{field_name}_mean', QVariant.Double))
+    provider = layer.dataProvider()
+    provider.addAttributes(fields)
+    layer.updateFields()
+
+    features = []
+    for slot, key in enumerate(aggregator.keys):
+        code = digipin_grid.unpack(key, aggregator.level)
+        min_lat, min_lon, max_lat, max_lon = digipin_grid.decode_bounds(code)
+        feature = QgsFeature(layer.fields())
+        feature.setGeometry(QgsGeometry.fromRect(QgsRectangle(min_lon, min_lat, max_lon, max_lat)))
+        attrs = [code, aggregator.counts[slot]]
+        for i in range(len(field_names)):
+            attrs.append(aggregator.sums[i][slot])
+            attrs.append(aggregator.mean(i, slot))
+        feature.setAttributes(attrs)
+        features.append(feature)
+    provider.addFeatures(features)
+    layer.updateExtents()
+    return layer
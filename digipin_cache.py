@@ -0,0 +1,58 @@
+# DIGIPIN ENCODER - A QGIS plugin for encoding and decoding DIGIPINs using India Post's API
+# Copyright (C) 2025 Beig Mehaboob
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from collections import OrderedDict
+
+from . import digipin_grid
+
+
+class ResultCache:
+    """Bounded LRU cache of API answers keyed by exact WGS84 coordinates.
+
+    Codes are kept as packed 40-bit keys rather than strings, and answers
+    that are not DIGIPINs are not cached. Only points with exactly the same
+    coordinates hit, so the counted hit rate measures duplicate points. Not
+    thread safe: use it from the thread that dispatches the requests.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, lat, lon):
+        """Return the cached DIGIPIN of a point, or None"""
+        key = self._entries.get((lat, lon))
+        if key is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((lat, lon))
+        self.hits += 1
+        return digipin_grid.unpack(key)
+
+    def put(self, lat, lon, digipin):
+        """Cache the DIGIPIN of a point, evicting the least recently used entry when full"""
+        try:
+            key = digipin_grid.pack(digipin)
+        except ValueError:
+            return
+        self._entries[(lat, lon)] = key
+        self._entries.move_to_end((lat, lon))
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
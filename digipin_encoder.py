@@ -14,27 +14,54 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import os
-import re
+import time
 from qgis.PyQt.QtCore import (QSettings, QTranslator, QCoreApplication, 
                              Qt, QTimer, QUrl)
 from qgis.PyQt.QtGui import QIcon, QDesktopServices
 from qgis.PyQt.QtWidgets import (QAction, QMessageBox, QProgressDialog, 
                                 QApplication, QMenu, QInputDialog, QDialog, 
-                                QDialogButtonBox, QListWidget, QVBoxLayout)
+                                QDialogButtonBox, QListWidget, QVBoxLayout,
+                                QFormLayout, QComboBox, QSpinBox, QCheckBox)
 from qgis.core import (QgsProject, QgsPointXY, QgsGeometry, QgsFeature, 
                       QgsField, QgsCoordinateTransform, 
                       QgsCoordinateReferenceSystem, QgsWkbTypes, 
-                      QgsMapLayer, QgsVectorLayer, QgsSettings)
+                      QgsMapLayer, QgsVectorLayer, QgsSettings,
+                      QgsFeatureRequest, QgsApplication, QgsMessageLog, Qgis,
+                      QgsDataSourceUri)
 from qgis.gui import QgsMapToolEmitPoint, QgsVertexMarker
 from qgis.utils import iface
-import requests
 from PyQt5.QtCore import QVariant
 from PyQt5.QtWidgets import QToolButton
 from PyQt5.QtWidgets import QAbstractItemView  # For selection mode
-
-from .digipin_encoder_dockwidget import DIGIPIN_ENCODERDockWidget
 import os.path
 
+# The dock widget, networking (requests), NumPy and the DIGIPIN engine modules
+# are imported where they are first needed, so loading the plugin at QGIS
+# startup only costs this module and one toolbar action.
+
+# Number of features written to the provider between two journal checkpoints
+CHECKPOINT_CHUNK = 500
+
+# Features between two progress dialog updates in streaming operations
+PROGRESS_INTERVAL = 1000
+
+# Features per provider write when updating whole columns
+WRITE_CHUNK = 10000
+
+# Attempts per point before a throttled or failed API request is given up
+MAX_API_ATTEMPTS = 3
+
+# API answers kept in the result cache
+RESULT_CACHE_SIZE = 100000
+
+# DIGIPIN level of the cells features are grouped by in spatial order
+SPATIAL_ORDER_LEVEL = 6
+
+
+def level_field_name(level):
+    """Return the output field of a DIGIPIN level; full codes keep the 'digipin' field"""
+    return 'digipin' if level == 10 else f'digipin_l{level}'
+
 class DIGIPIN_ENCODER:
     def __init__(self, iface):
         self.iface = iface
@@ -55,7 +82,7 @@ class DIGIPIN_ENCODER:
         self.toolbar = self.iface.addToolBar(u'DIGIPIN_ENCODER')
         self.toolbar.setObjectName(u'DIGIPIN_ENCODER')
         
-        # Plugin components
+        # Plugin components (the dock widget is built on first run)
         self.dockwidget = None
         self.map_tool = None
         self.marker = None
@@ -64,6 +91,11 @@ class DIGIPIN_ENCODER:
         # API configuration
         self.api_base = "https://api.geospatialkeeda.site"
         self.api_key = ""  # Add your API key here if needed
+        self._rate_controller = None
+        self._result_cache = None
+        
+        # Load cost probe, see log_startup_timings()
+        self.startup_timings = {}
 
     def tr(self, message):
         return QCoreApplication.translate('DIGIPIN_ENCODER', message)
@@ -104,6 +136,7 @@ class DIGIPIN_ENCODER:
         return action
 
     def initGui(self):
+        started = time.perf_counter()
         icon_path = os.path.join(os.path.dirname(__file__), 'icon.png')
         
         # Main plugin action - shows/hides the dock widget
@@ -113,15 +146,34 @@ class DIGIPIN_ENCODER:
             callback=self.run,
             parent=self.iface.mainWindow())
         
-        # Create dock widget (initially hidden)
+        self.startup_timings['initGui'] = time.perf_counter() - started
+        self.log_startup_timings()
+
+    def log_startup_timings(self):
+        """Log the plugin load cost (import, __init__, initGui) to the QGIS message log"""
+        timings = ', '.join(f"{step} {seconds * 1000:.1f} ms" for step, seconds in self.startup_timings.items())
+        total = sum(self.startup_timings.values()) * 1000
+        QgsMessageLog.logMessage(f"Plugin load: {timings} (total {total:.1f} ms)", 'DIGIPIN ENCODER', Qgis.Info)
+
+    def _create_dockwidget(self):
+        """Build the dock widget and wire its signals on first use"""
+        started = time.perf_counter()
+        from .digipin_encoder_dockwidget import DIGIPIN_ENCODERDockWidget
+        
         self.dockwidget = DIGIPIN_ENCODERDockWidget()
         self.iface.addDockWidget(Qt.RightDockWidgetArea, self.dockwidget)
-        self.dockwidget.hide()
         
         # Add tooltips
         self.dockwidget.getDigipinButton.setToolTip(self.tr("Click to activate map tool and select a point for DIGIPIN encoding"))
         self.dockwidget.processLayerButton.setToolTip(self.tr("Process the active vector layer to add DIGIPIN data"))
         self.dockwidget.batchProcessButton.setToolTip(self.tr("Batch process multiple selected vector layers to add DIGIPIN data"))
+        self.dockwidget.resumeJobButton.setToolTip(self.tr("Resume the last canceled or interrupted job of the active layer"))
+        self.dockwidget.retryFailuresButton.setToolTip(self.tr("Process again the features that failed in the last job of the active layer"))
+        self.dockwidget.digipinKeyCheckBox.setToolTip(self.tr("Also store each DIGIPIN as a sortable 40-bit integer in a 'digipin_key' field"))
+        self.dockwidget.levelsLineEdit.setToolTip(self.tr("Comma-separated DIGIPIN levels (1-10) to write; level 10 goes to 'digipin', others to 'digipin_l<level>'"))
+        self.dockwidget.aggregateButton.setToolTip(self.tr("Count, sum and average the active layer per DIGIPIN cell into a new cell layer"))
+        self.dockwidget.joinButton.setToolTip(self.tr("Join a point layer to a polygon layer through DIGIPIN cell keys"))
+        self.dockwidget.validateColumnButton.setToolTip(self.tr("Check a DIGIPIN field of the active layer locally and flag invalid values"))
         self.dockwidget.clearGetDigipinButton.setToolTip(self.tr("Clear Get DIGIPIN results"))
         self.dockwidget.clearDecodeButton.setToolTip(self.tr("Clear Decode DIGIPIN input"))
         
@@ -139,8 +191,17 @@ class DIGIPIN_ENCODER:
         self.dockwidget.decodeButton.clicked.connect(self.decode_digipin)
         self.dockwidget.validateButton.clicked.connect(self.validate_digipin)
         self.dockwidget.batchProcessButton.clicked.connect(self.batch_process_layers)
+        self.dockwidget.validateColumnButton.clicked.connect(self.validate_digipin_column)
+        self.dockwidget.resumeJobButton.clicked.connect(self.resume_job)
+        self.dockwidget.retryFailuresButton.clicked.connect(self.retry_failures)
+        self.dockwidget.aggregateButton.clicked.connect(self.aggregate_by_cell)
+        self.dockwidget.joinButton.clicked.connect(self.join_by_cell)
         self.dockwidget.closed.connect(self.on_dockwidget_close)
         self.dockwidget.instructionsTextEdit.anchorClicked.connect(self.handle_link_clicked)
+        
+        QgsMessageLog.logMessage(
+            f"Dock widget built in {(time.perf_counter() - started) * 1000:.1f} ms",
+            'DIGIPIN ENCODER', Qgis.Info)
 
     def handle_link_clicked(self, url):
         """Handle clicks on hyperlinks in instructionsTextEdit"""
@@ -163,8 +224,12 @@ class DIGIPIN_ENCODER:
         del self.toolbar
 
     def run(self):
-        """Show/hide the dock widget"""
-        if self.dockwidget.isVisible():
+        """Show/hide the dock widget, building it the first time"""
+        if self.dockwidget is None:
+            self._create_dockwidget()
+            self.dockwidget.show()
+            self.dockwidget.raise_()
+        elif self.dockwidget.isVisible():
             self.dockwidget.hide()
         else:
             self.dockwidget.show()
@@ -253,8 +318,49 @@ class DIGIPIN_ENCODER:
         except Exception as e:
             self.dockwidget.statusLabel.setText(self.tr(f"Error: {str(e)}"))
 
+    @property
+    def rate_controller(self):
+        """Adaptive rate controller of the API, created on first use"""
+        if self._rate_controller is None:
+            from .digipin_rate_control import AdaptiveRateController
+            self._rate_controller = AdaptiveRateController()
+        return self._rate_controller
+
+    @property
+    def result_cache(self):
+        """LRU cache of API answers by coordinates, created on first use"""
+        if self._result_cache is None:
+            from .digipin_cache import ResultCache
+            self._result_cache = ResultCache(RESULT_CACHE_SIZE)
+        return self._result_cache
+
     def get_digipin_from_coords(self, lat, lon):
-        """Get DIGIPIN from coordinates using API"""
+        """Get DIGIPIN from coordinates using API, or the local engine while the API is unavailable"""
+        if self.rate_controller.retry_delay() or not self.rate_controller.allow_api():
+            digipin, error = self._encode_locally(lat, lon)
+        else:
+            digipin, error, _ = self._request_digipin(lat, lon)
+        if error:
+            self.dockwidget.statusLabel.setText(self.tr(error))
+        return digipin
+
+    def _encode_locally(self, lat, lon, level=None):
+        """Encode coordinates with the local DIGIPIN engine, returning (digipin, error message)"""
+        from . import digipin_grid
+        try:
+            return digipin_grid.encode(lat, lon, level or digipin_grid.CODE_LENGTH), None
+        except ValueError as e:
+            return None, f"Local encoding error: {str(e)}"
+
+    def _request_digipin(self, lat, lon):
+        """Request a DIGIPIN from the API, returning (digipin, error message, retryable).
+
+        Safe to call from worker threads: it does not touch the UI and reports
+        the latency and outcome of the call to the adaptive rate controller.
+        """
+        import requests
+        from .digipin_rate_control import parse_retry_after
+        controller = self.rate_controller
         try:
             # Construct URL with proper parameters
             url = f"{self.api_base}/api/digipin/encode"
@@ -267,83 +373,226 @@ class DIGIPIN_ENCODER:
                 headers["x-api-key"] = self.api_key
 
             # Send POST request
+            started = time.monotonic()
             response = requests.post(url, json=payload, headers=headers, timeout=10)
-            response.raise_for_status()  # Raises exception for 4xx/5xx errors
+            latency = time.monotonic() - started
+
+            # Throttling and server errors shrink the request window
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if response.status_code == 429:
+                controller.record_throttle(retry_after)
+                return None, "API Error: Too many requests (429)", True
+            if response.status_code >= 500:
+                controller.record_failure(retry_after)
+                return None, f"API Error: Server error ({response.status_code})", True
+            if response.status_code >= 400:
+                controller.record_client_error()
+            else:
+                controller.record_success(latency)
+            response.raise_for_status()  # Raises exception for 4xx errors
 
             # Parse response
             data = response.json()
             digipin = data.get("digipin")
             if digipin:
                 print(f"Received DIGIPIN: {digipin}")  # Debug log
-                return digipin
+                return digipin, None, False
             else:
-                self.dockwidget.statusLabel.setText(self.tr("API returned no DIGIPIN"))
-                return None
+                return None, "API returned no DIGIPIN", False
 
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                self.dockwidget.statusLabel.setText(self.tr("API Error: Endpoint not found. Check internet or contact support at admin@geospatialkeeda.site"))
-            else:
-                self.dockwidget.statusLabel.setText(self.tr(f"API Error: {str(e)}"))
             print(f"HTTP Error: {str(e)}")  # Debug log
-            return None
+            if e.response.status_code == 404:
+                return None, "API Error: Endpoint not found. Check internet or contact support at admin@geospatialkeeda.site", False
+            return None, f"API Error: {str(e)}", False
         except requests.exceptions.RequestException as e:
-            self.dockwidget.statusLabel.setText(self.tr(f"API Connection Error: {str(e)}"))
             print(f"Connection Error: {str(e)}")  # Debug log
-            return None
+            controller.record_failure()
+            return None, f"API Connection Error: {str(e)}", True
         except ValueError as e:  # Catch JSON decode errors
-            self.dockwidget.statusLabel.setText(self.tr(f"API Response Error: Invalid JSON - {str(e)}"))
             print(f"JSON Error: {str(e)} with response: {response.text}")  # Debug log with raw response
-            return None
+            return None, f"API Response Error: Invalid JSON - {str(e)}", False
 
-    def process_layer(self):
-        """Process selected vector layer to add DIGIPIN information"""
+    def _encode_points(self, points, progress, progress_offset):
+        """Encode a list of (lat, lon) points concurrently through the API.
+
+        The number of requests in flight follows the adaptive rate controller,
+        requests are held back while a Retry-After is pending and throttled or
+        failed requests are queued again up to MAX_API_ATTEMPTS times. Points
+        already answered are taken from the result cache, and while the
+        circuit breaker is open points are encoded with the local engine
+        instead. Stops submitting when the progress dialog is canceled.
+        Returns a dict mapping point index to (digipin, error message).
+        """
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+        from .digipin_rate_control import CLOSED
+        controller = self.rate_controller
+        cache = self.result_cache
+        results = {}
+        attempts = {}
+        pending = deque(range(len(points)))
+        in_flight = {}
+        executor = ThreadPoolExecutor(max_workers=controller.max_limit)
+        try:
+            while pending or in_flight:
+                if progress.wasCanceled():
+                    pending.clear()
+                
+                # Fill the request window; Retry-After only holds back API
+                # submissions, points still go local while the breaker is open
+                while pending and len(in_flight) < controller.limit:
+                    held = controller.retry_delay() > 0
+                    if held and controller.state == CLOSED:
+                        break
+                    index = pending.popleft()
+                    if index not in attempts:
+                        cached = cache.get(*points[index])
+                        if cached:
+                            results[index] = (cached, None)
+                            continue
+                    if held or not controller.allow_api():
+                        results[index] = self._encode_locally(*points[index])
+                        continue
+                    attempts[index] = attempts.get(index, 0) + 1
+                    in_flight[executor.submit(self._request_digipin, *points[index])] = index
+                
+                if in_flight:
+                    done, _ = wait(list(in_flight), timeout=0.1, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = in_flight.pop(future)
+                        digipin, error, retryable = future.result()
+                        if retryable and attempts[index] < MAX_API_ATTEMPTS:
+                            pending.append(index)
+                        elif retryable and controller.state != CLOSED:
+                            results[index] = self._encode_locally(*points[index])
+                        else:
+                            results[index] = (digipin, error)
+                            if digipin:
+                                cache.put(*points[index], digipin)
+                elif pending:
+                    time.sleep(min(controller.retry_delay(), 0.1))
+                
+                progress.setValue(progress_offset + len(results))
+                QApplication.processEvents()
+        finally:
+            executor.shutdown(wait=True)
+        return results
+
+    def _active_encodable_layer(self):
+        """Return the active layer if it is a point or polygon vector layer, warning otherwise"""
         layer = self.iface.activeLayer()
         if not layer:
             QMessageBox.warning(self.dockwidget, "No Layer", "Please select a vector layer first")
-            return
+            return None
         
         if layer.type() != QgsMapLayer.VectorLayer:
             QMessageBox.warning(self.dockwidget, "Invalid Layer", "Selected layer is not a vector layer")
-            return
-        
-        # Check geometry type
-        geom_type = layer.geometryType()
+            return None
         
-        if geom_type not in (QgsWkbTypes.PointGeometry, QgsWkbTypes.PolygonGeometry):
+        if layer.geometryType() not in (QgsWkbTypes.PointGeometry, QgsWkbTypes.PolygonGeometry):
             QMessageBox.warning(self.dockwidget, "Unsupported Type", 
                               "Only point and polygon layers are supported")
-            return
-        
-        # Ask for confirmation for polygon layers
-        if geom_type == QgsWkbTypes.PolygonGeometry:
-            reply = QMessageBox.question(
-                self.dockwidget,
-                "Confirm Processing",
-                "This is a polygon layer. DIGIPINs will be generated using point-on-surface method.\n\n"
-                "Would you like to continue?",
-                QMessageBox.Yes | QMessageBox.No
-            )
-            if reply == QMessageBox.No:
-                return
+            return None
         
-        # Check if layer is in WGS84 or needs transformation
+        return layer
+
+    def _wgs84_transform(self, layer):
+        """Return a transform from the layer CRS to WGS84, or None if the layer is already WGS84"""
         layer_crs = layer.crs()
-        transform_needed = layer_crs.authid() != 'EPSG:4326'
-        if transform_needed:
-            transform_context = QgsProject.instance().transformContext()
-            xform = QgsCoordinateTransform(
-                layer_crs,
-                QgsCoordinateReferenceSystem('EPSG:4326'),
-                transform_context)
+        if layer_crs.authid() == 'EPSG:4326':
+            return None
+        return QgsCoordinateTransform(
+            layer_crs,
+            QgsCoordinateReferenceSystem('EPSG:4326'),
+            QgsProject.instance().transformContext())
+
+    def _feature_point(self, geom, geom_type, xform):
+        """Return the WGS84 point a feature is encoded from"""
+        # Get point based on geometry type
+        if geom_type == QgsWkbTypes.PointGeometry:
+            point = geom.asPoint()
+        else:  # Polygon geometry
+            point = geom.pointOnSurface().asPoint()
         
-        # Add new fields if they don't exist
-        layer.beginEditCommand("Add DIGIPIN fields")
-        provider = layer.dataProvider()
+        # Transform if needed
+        if xform is not None:
+            point = xform.transform(point)
+        return point
+
+    def _spatial_order(self, layer, geom_type):
+        """Return (order keys, fids) int64 arrays of a layer's features sorted by coarse DIGIPIN cell.
+
+        Geometry-only pass: the order key is the packed key of the feature's
+        cell at SPATIAL_ORDER_LEVEL, so features of one cell are adjacent and
+        cells follow the grid's quadtree order; ties are in fid order.
+        Polygons are placed by their bounding box centre. Empty features and
+        features outside the DIGIPIN area get the largest key and sort last.
+        """
+        from array import array
+        import numpy as np
+        from . import digipin_grid
+        xform = self._wgs84_transform(layer)
+        outside = 1 << (4 * SPATIAL_ORDER_LEVEL)
+        request = QgsFeatureRequest().setNoAttributes()
+        keys = array('q')
+        fids = array('q')
+        for feature in layer.getFeatures(request):
+            geom = feature.geometry()
+            key = outside
+            if not geom.isEmpty():
+                if geom_type == QgsWkbTypes.PointGeometry:
+                    point = geom.asPoint()
+                else:
+                    point = geom.boundingBox().center()
+                if xform is not None:
+                    point = xform.transform(point)
+                try:
+                    key = digipin_grid.encode_key(point.y(), point.x(), SPATIAL_ORDER_LEVEL)
+                except ValueError:
+                    pass
+            keys.append(key)
+            fids.append(feature.id())
+        keys = np.frombuffer(keys, dtype=np.int64)
+        fids = np.frombuffer(fids, dtype=np.int64)
+        order = np.lexsort((fids, keys))
+        return keys[order], fids[order]
+
+    def _job_order(self, layer, geom_type):
+        """Return (fids, order keys, ordering) of a new job, in spatial order if the dock option is checked"""
+        from .digipin_job_journal import ORDER_FID, ORDER_SPATIAL
+        if not self.dockwidget.spatialOrderCheckBox.isChecked():
+            return sorted(layer.allFeatureIds()), None, ORDER_FID
+        keys, fids = self._spatial_order(layer, geom_type)
+        return fids, keys, ORDER_SPATIAL
+
+    def _selected_levels(self):
+        """Return the sorted DIGIPIN levels entered in the dock, or None after warning about bad input"""
+        text = self.dockwidget.levelsLineEdit.text().replace(' ', '') or '10'
+        try:
+            levels = sorted({int(part) for part in text.split(',') if part})
+        except ValueError:
+            levels = []
+        if not levels or levels[0] < 1 or levels[-1] > 10:
+            QMessageBox.warning(self.dockwidget, "Invalid Levels", 
+                              "DIGIPIN levels must be comma-separated numbers from 1 to 10 (e.g., 4,6,10)")
+            return None
+        if self.dockwidget.digipinKeyCheckBox.isChecked() and 10 not in levels:
+            QMessageBox.information(self.dockwidget, "No digipin_key", 
+                                  "The digipin_key field holds full DIGIPINs and is only written when level 10 is selected. "
+                                  "It will not be added for this run.")
+        return levels
+
+    def _write_key_selected(self, levels):
+        """Return True if the dock asks for a digipin_key field and the levels include full codes"""
+        return self.dockwidget.digipinKeyCheckBox.isChecked() and 10 in levels
+
+    def _add_digipin_fields(self, layer, geom_type, levels, write_key):
+        """Add the DIGIPIN output fields the layer does not have yet"""
         fields_to_add = []
-        
-        if layer.fields().indexFromName('digipin') == -1:
-            fields_to_add.append(QgsField('digipin', QVariant.String))
+        for level in levels:
+            if layer.fields().indexFromName(level_field_name(level)) == -1:
+                fields_to_add.append(QgsField(level_field_name(level), QVariant.String))
         if layer.fields().indexFromName('latitude') == -1:
             fields_to_add.append(QgsField('latitude', QVariant.Double, len=10, prec=6))
         if layer.fields().indexFromName('longitude') == -1:
@@ -352,15 +601,76 @@ class DIGIPIN_ENCODER:
             fields_to_add.append(QgsField('google_map', QVariant.String, len=255))
         if geom_type == QgsWkbTypes.PolygonGeometry and layer.fields().indexFromName('digipin_note') == -1:
             fields_to_add.append(QgsField('digipin_note', QVariant.String, len=100))
+        if write_key and layer.fields().indexFromName('digipin_key') == -1:
+            fields_to_add.append(QgsField('digipin_key', QVariant.LongLong))
         
         if fields_to_add:
-            provider.addAttributes(fields_to_add)
+            layer.beginEditCommand("Add DIGIPIN fields")
+            layer.dataProvider().addAttributes(fields_to_add)
             layer.updateFields()
+            layer.endEditCommand()
+
+    def _journal_path(self):
+        """Return the job journal file, stored next to the project file when there is one"""
+        project_file = QgsProject.instance().fileName()
+        if project_file:
+            return os.path.splitext(project_file)[0] + '_digipin_jobs.sqlite'
+        return os.path.join(QgsApplication.qgisSettingsDirPath(), 'digipin_jobs.sqlite')
+
+    def _open_journal(self):
+        """Open the job journal, falling back to the settings directory; returns None after warning if neither opens"""
+        import sqlite3
+        from .digipin_job_journal import JobJournal
+        fallback = os.path.join(QgsApplication.qgisSettingsDirPath(), 'digipin_jobs.sqlite')
+        error = None
+        for path in dict.fromkeys((self._journal_path(), fallback)):
+            try:
+                return JobJournal(path)
+            except sqlite3.Error as e:
+                QgsMessageLog.logMessage(f"Cannot open job journal {path}: {str(e)}", 'DIGIPIN ENCODER', Qgis.Warning)
+                error = e
+        QMessageBox.warning(self.dockwidget, "Job Journal Error", 
+                          f"Could not open the job journal: {str(error)}\n\n"
+                          "Check that the project folder or the QGIS settings folder is writable.")
+        return None
+
+    def _journal_source(self, layer):
+        """Return the layer source recorded in the job journal, without stored credentials"""
+        return QgsDataSourceUri.removePassword(layer.source())
+
+    def _run_encoding_job(self, layer, geom_type, fids, journal, job_id, levels, write_key,
+                          order_keys=None, retry=False):
+        """Encode the given features at the given DIGIPIN levels and record progress in the job journal.
+
+        Features are visited in the order of fids (ascending fid, or spatial
+        order when order_keys holds the order key of each fid) and their
+        attributes are written to the provider every CHECKPOINT_CHUNK features,
+        after which the last written fid (and its order key) is checkpointed,
+        so a canceled or crashed run can resume right after it. Features the
+        API fails on are recorded with the error so they can be retried. Each
+        point is encoded once at the finest level and coarser levels are its
+        prefixes; runs without full codes stop the local descent at their
+        finest level instead of calling the API. digipin_key is only written
+        when write_key is set, even if the field exists.
+        Returns (processed, failed, canceled, stats).
+        """
+        from . import digipin_grid
+        from .digipin_job_journal import STATUS_CANCELED, STATUS_COMPLETE
+        xform = self._wgs84_transform(layer)
+        provider = layer.dataProvider()
+        fields = layer.fields()
+        finest = levels[-1]
+        level_idxs = {level: fields.indexFromName(level_field_name(level)) for level in levels}
+        lat_idx = fields.indexFromName('latitude')
+        lon_idx = fields.indexFromName('longitude')
+        map_idx = fields.indexFromName('google_map')
+        note_idx = fields.indexFromName('digipin_note')
+        key_idx = fields.indexFromName('digipin_key') if write_key else -1
+        note = "DIGIPIN generated from point-on-surface" if geom_type == QgsWkbTypes.PolygonGeometry else None
         
-        # Process features
-        total_features = layer.featureCount()
+        total_features = len(fids)
         progress = QProgressDialog(
-            "Processing layer...", 
+            f"Processing {layer.name()}...", 
             "Cancel", 
             0, 
             total_features, 
@@ -368,65 +678,151 @@ class DIGIPIN_ENCODER:
         progress.setWindowTitle("DIGIPIN Processing")
         progress.setWindowModality(Qt.WindowModal)
         
+        cache = self.result_cache
+        cache_hits = cache.hits
+        cache_lookups = cache.hits + cache.misses
+        write_seconds = 0.0
+        
         processed_count = 0
-        layer.beginEditCommand("Process DIGIPIN encoding")
-        for i, feature in enumerate(layer.getFeatures()):
-            if progress.wasCanceled():
-                layer.destroyEditCommand()
-                break
-            
-            progress.setValue(i)
-            QApplication.processEvents()
-            
-            geom = feature.geometry()
-            if geom.isEmpty():
-                continue
+        failed_count = 0
+        visited = 0
+        canceled = False
+        for start in range(0, total_features, CHECKPOINT_CHUNK):
+            chunk = [int(fid) for fid in fids[start:start + CHECKPOINT_CHUNK]]
+            request = QgsFeatureRequest().setFilterFids(chunk)
+            request.setNoAttributes()
+            features = {feature.id(): feature for feature in layer.getFeatures(request)}
             
-            # Get point based on geometry type
-            if geom_type == QgsWkbTypes.PointGeometry:
-                point = geom.asPoint()
-                note = None
-            else:  # Polygon geometry
-                point = geom.pointOnSurface().asPoint()
-                note = "DIGIPIN generated from point-on-surface"
-            
-            # Transform if needed
-            if transform_needed:
-                point = xform.transform(point)
+            # Representative WGS84 point of each feature, in job order
+            walked = []
+            points = []
+            for position, fid in enumerate(chunk):
+                feature = features.get(fid)
+                if feature is None:  # Deleted since the job started
+                    continue
+                geom = feature.geometry()
+                if geom.isEmpty():
+                    walked.append((position, fid, None))
+                    continue
+                
+                point = self._feature_point(geom, geom_type, xform)
+                walked.append((position, fid, len(points)))
+                points.append((point.y(), point.x()))
             
-            lat, lon = point.y(), point.x()
+            # Get DIGIPINs at the finest requested level
+            if finest == digipin_grid.CODE_LENGTH:
+                results = self._encode_points(points, progress, visited)
+            else:
+                results = {index: self._encode_locally(lat, lon, finest)
+                           for index, (lat, lon) in enumerate(points)}
+                progress.setValue(visited + len(points))
+                QApplication.processEvents()
+            canceled = progress.wasCanceled()
             
-            # Get DIGIPIN
-            digipin = self.get_digipin_from_coords(lat, lon)
-            if not digipin:
-                continue
+            # Only the leading run of finished features is committed, so the
+            # checkpoint never skips a feature that is still missing
+            changes = {}
+            failures = []
+            last_fid = None
+            last_key = None
+            chunk_visited = 0
+            for position, fid, index in walked:
+                if index is not None and index not in results:
+                    break
+                last_fid = fid
+                if order_keys is not None:
+                    last_key = int(order_keys[start + position])
+                chunk_visited += 1
+                if index is None:
+                    continue
+                
+                lat, lon = points[index]
+                digipin, error = results[index]
+                if not digipin:
+                    failures.append((fid, error))
+                    continue
+                
+                # Coarser levels are parents of the finest cell's key
+                try:
+                    key = digipin_grid.pack(digipin)
+                except ValueError:  # Not a DIGIPIN, only write it as answered
+                    key = None
+                
+                # Update feature attributes
+                attrs = {}
+                for level, level_idx in level_idxs.items():
+                    if level_idx == -1:
+                        continue
+                    if level == finest:
+                        attrs[level_idx] = digipin
+                    elif key is not None:
+                        attrs[level_idx] = digipin_grid.unpack(digipin_grid.parent_key(key, level, finest), level)
+                if lat_idx != -1:
+                    attrs[lat_idx] = lat
+                if lon_idx != -1:
+                    attrs[lon_idx] = lon
+                if map_idx != -1:
+                    attrs[map_idx] = f"https://www.google.com/maps?q={lat},{lon}"
+                if note and note_idx != -1:
+                    attrs[note_idx] = note
+                if key_idx != -1 and key is not None and finest == digipin_grid.CODE_LENGTH:
+                    attrs[key_idx] = key
+                
+                if attrs:
+                    changes[fid] = attrs
             
-            # Update feature attributes
-            attrs = {}
-            digipin_idx = layer.fields().indexFromName('digipin')
-            if digipin_idx != -1:
-                attrs[digipin_idx] = digipin
-            lat_idx = layer.fields().indexFromName('latitude')
-            if lat_idx != -1:
-                attrs[lat_idx] = lat
-            lon_idx = layer.fields().indexFromName('longitude')
-            if lon_idx != -1:
-                attrs[lon_idx] = lon
-            map_idx = layer.fields().indexFromName('google_map')
-            if map_idx != -1:
-                attrs[map_idx] = f"https://www.google.com/maps?q={lat},{lon}"
-            if note and layer.fields().indexFromName('digipin_note') != -1:
-                note_idx = layer.fields().indexFromName('digipin_note')
-                attrs[note_idx] = note
+            # Commit the chunk before checkpointing it
+            if changes:
+                write_started = time.perf_counter()
+                provider.changeAttributeValues(changes)
+                write_seconds += time.perf_counter() - write_started
+            journal.commit_chunk(job_id, None if retry else last_fid, chunk_visited,
+                                 changes.keys(), failures, last_key)
+            processed_count += len(changes)
+            failed_count += len(failures)
+            visited += chunk_visited
             
-            if attrs:
-                provider.changeAttributeValues({feature.id(): attrs})
-                processed_count += 1
+            if canceled:
+                break
         
         progress.setValue(total_features)
-        layer.endEditCommand()
+        if not retry:
+            journal.set_status(job_id, STATUS_CANCELED if canceled else STATUS_COMPLETE)
+        layer.triggerRepaint()
         
-        # Show completion message with processing note
+        stats = {
+            'order': 'spatial' if order_keys is not None else 'fid',
+            'cache_hits': cache.hits - cache_hits,
+            'cache_lookups': cache.hits + cache.misses - cache_lookups,
+            'written': processed_count,
+            'write_seconds': write_seconds,
+        }
+        self.log_job_stats(layer, stats)
+        return processed_count, failed_count, canceled, stats
+
+    def _format_job_stats(self, stats):
+        """Describe the feature order, API cache hit rate and write throughput of a job.
+
+        The cache is keyed by exact coordinates, so its hit rate only counts
+        duplicate points; feature order has little effect on it.
+        """
+        lines = [f"Feature order: {stats['order']}"]
+        if stats['cache_lookups']:
+            hit_rate = 100.0 * stats['cache_hits'] / stats['cache_lookups']
+            lines.append(f"API cache (duplicate points): {stats['cache_hits']} of {stats['cache_lookups']} lookups hit ({hit_rate:.1f}%)")
+        if stats['write_seconds']:
+            throughput = stats['written'] / stats['write_seconds']
+            lines.append(f"Writes: {stats['written']} features in {stats['write_seconds']:.2f} s "
+                         f"({throughput:.0f} features/s)")
+        return '\n'.join(lines)
+
+    def log_job_stats(self, layer, stats):
+        """Log the statistics of an encoding job to the QGIS message log"""
+        message = self._format_job_stats(stats).replace('\n', '; ')
+        QgsMessageLog.logMessage(f"{layer.name()}: {message}", 'DIGIPIN ENCODER', Qgis.Info)
+
+    def _show_job_summary(self, layer, geom_type, processed_count, failed_count, canceled, stats):
+        """Show the completion message of an encoding job"""
         if geom_type == QgsWkbTypes.PolygonGeometry:
             msg = (f"Processed {processed_count} polygon features using point-on-surface method.\n\n"
                   "Note: DIGIPINs were generated for representative points within each polygon.\n"
@@ -434,9 +830,127 @@ class DIGIPIN_ENCODER:
         else:
             msg = f"Successfully processed {processed_count} point features"
         
+        if failed_count:
+            msg += (f"\n\n{failed_count} features failed and were recorded in the job journal. "
+                    "Use 'Retry Failures' to process them again.")
+        if canceled:
+            msg += "\n\nProcessing was canceled. Use 'Resume Job' to continue where it stopped."
+        msg += "\n\n" + self._format_job_stats(stats)
+        
         QMessageBox.information(self.dockwidget, "Processing Complete", msg)
         self.dockwidget.statusLabel.setText(f"Processed {layer.name()}")
 
+    def process_layer(self):
+        """Process selected vector layer to add DIGIPIN information"""
+        layer = self._active_encodable_layer()
+        if not layer:
+            return
+        levels = self._selected_levels()
+        if not levels:
+            return
+        
+        # Check geometry type
+        geom_type = layer.geometryType()
+        
+        # Ask for confirmation for polygon layers
+        if geom_type == QgsWkbTypes.PolygonGeometry:
+            reply = QMessageBox.question(
+                self.dockwidget,
+                "Confirm Processing",
+                "This is a polygon layer. DIGIPINs will be generated using point-on-surface method.\n\n"
+                "Would you like to continue?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply == QMessageBox.No:
+                return
+        
+        # Add new fields if they don't exist
+        write_key = self._write_key_selected(levels)
+        self._add_digipin_fields(layer, geom_type, levels, write_key)
+        
+        # Process features as a journaled job
+        fids, order_keys, ordering = self._job_order(layer, geom_type)
+        journal = self._open_journal()
+        if journal is None:
+            return
+        try:
+            job_id = journal.start_job(layer.id(), self._journal_source(layer), len(fids), levels,
+                                       ordering, write_key)
+            result = self._run_encoding_job(layer, geom_type, fids, journal, job_id, levels, write_key, order_keys)
+        finally:
+            journal.close()
+        
+        self._show_job_summary(layer, geom_type, *result)
+
+    def resume_job(self):
+        """Resume the last canceled or interrupted job of the active layer after its checkpoint"""
+        from .digipin_job_journal import JobJournal, STATUS_RUNNING, ORDER_SPATIAL
+        layer = self._active_encodable_layer()
+        if not layer:
+            return
+        
+        geom_type = layer.geometryType()
+        journal = self._open_journal()
+        if journal is None:
+            return
+        try:
+            job = journal.find_resumable_job(layer.id(), self._journal_source(layer))
+            if job is None:
+                QMessageBox.information(self.dockwidget, "Resume Job", 
+                                      f"No interrupted job found for {layer.name()}")
+                return
+            
+            last_fid = job['last_fid']
+            order_keys = None
+            if job['ordering'] == ORDER_SPATIAL:
+                # Features moved since the cancel are placed by their new cell
+                order_keys, fids = self._spatial_order(layer, geom_type)
+                if last_fid is not None:
+                    last_key = job['last_key']
+                    after = (order_keys > last_key) | ((order_keys == last_key) & (fids > last_fid))
+                    order_keys, fids = order_keys[after], fids[after]
+            else:
+                fids = sorted(fid for fid in layer.allFeatureIds() if last_fid is None or fid > last_fid)
+            levels = JobJournal.job_levels(job)
+            write_key = JobJournal.job_writes_key(job)
+            self._add_digipin_fields(layer, geom_type, levels, write_key)
+            journal.set_status(job['job_id'], STATUS_RUNNING)
+            result = self._run_encoding_job(layer, geom_type, fids, journal, job['job_id'], levels, write_key,
+                                            order_keys)
+        finally:
+            journal.close()
+        
+        self._show_job_summary(layer, geom_type, *result)
+
+    def retry_failures(self):
+        """Process again the features recorded as failed by the last job of the active layer"""
+        from .digipin_job_journal import JobJournal
+        layer = self._active_encodable_layer()
+        if not layer:
+            return
+        
+        geom_type = layer.geometryType()
+        journal = self._open_journal()
+        if journal is None:
+            return
+        try:
+            job = journal.latest_job_with_failures(layer.id(), self._journal_source(layer))
+            if job is None:
+                QMessageBox.information(self.dockwidget, "Retry Failures", 
+                                      f"No failed features recorded for {layer.name()}")
+                return
+            
+            fids = [fid for fid, reason in journal.failures(job['job_id'])]
+            levels = JobJournal.job_levels(job)
+            write_key = JobJournal.job_writes_key(job)
+            self._add_digipin_fields(layer, geom_type, levels, write_key)
+            result = self._run_encoding_job(layer, geom_type, fids, journal, job['job_id'], levels, write_key,
+                                            retry=True)
+        finally:
+            journal.close()
+        
+        self._show_job_summary(layer, geom_type, *result)
+
     def batch_process_layers(self):
         """Process multiple selected vector layers to add DIGIPIN information"""
         # Get all layers from the project
@@ -447,6 +961,10 @@ class DIGIPIN_ENCODER:
             QMessageBox.warning(self.dockwidget, "No Vector Layers", 
                               "No vector layers found in the project")
             return
+        levels = self._selected_levels()
+        if not levels:
+            return
+        write_key = self._write_key_selected(levels)
         
         # Create a dialog to select layers
         dialog = QDialog(self.dockwidget)
@@ -490,138 +1008,305 @@ class DIGIPIN_ENCODER:
             progress.setWindowModality(Qt.WindowModal)
             
             processed_count = 0
-            for i, layer in enumerate(layers):
-                if progress.wasCanceled():
-                    break
-                
-                progress.setValue(i)
-                QApplication.processEvents()
-                
-                geom_type = layer.geometryType()
-                if geom_type not in (QgsWkbTypes.PointGeometry, QgsWkbTypes.PolygonGeometry):
-                    self.dockwidget.statusLabel.setText(self.tr(f"Skipping {layer.name()}: Unsupported geometry type"))
-                    continue
-                
-                # Ask for confirmation for polygon layers
-                if geom_type == QgsWkbTypes.PolygonGeometry:
-                    reply = QMessageBox.question(
-                        self.dockwidget,
-                        "Confirm Processing",
-                        f"This is a polygon layer ({layer.name()}). DIGIPINs will be generated using point-on-surface method.\n\n"
-                        "Would you like to continue?",
-                        QMessageBox.Yes | QMessageBox.No
-                    )
-                    if reply == QMessageBox.No:
-                        continue
-                
-                # Check if layer is in WGS84 or needs transformation
-                layer_crs = layer.crs()
-                transform_needed = layer_crs.authid() != 'EPSG:4326'
-                if transform_needed:
-                    transform_context = QgsProject.instance().transformContext()
-                    xform = QgsCoordinateTransform(
-                        layer_crs,
-                        QgsCoordinateReferenceSystem('EPSG:4326'),
-                        transform_context)
-                
-                # Add new fields if they don't exist
-                layer.beginEditCommand("Add DIGIPIN fields")
-                provider = layer.dataProvider()
-                fields_to_add = []
-                if layer.fields().indexFromName('digipin') == -1:
-                    fields_to_add.append(QgsField('digipin', QVariant.String))
-                if layer.fields().indexFromName('latitude') == -1:
-                    fields_to_add.append(QgsField('latitude', QVariant.Double, len=10, prec=6))
-                if layer.fields().indexFromName('longitude') == -1:
-                    fields_to_add.append(QgsField('longitude', QVariant.Double, len=10, prec=6))
-                if layer.fields().indexFromName('google_map') == -1:
-                    fields_to_add.append(QgsField('google_map', QVariant.String, len=255))
-                if geom_type == QgsWkbTypes.PolygonGeometry and layer.fields().indexFromName('digipin_note') == -1:
-                    fields_to_add.append(QgsField('digipin_note', QVariant.String, len=100))
-                
-                if fields_to_add:
-                    provider.addAttributes(fields_to_add)
-                    layer.updateFields()
-                layer.endEditCommand()
-                
-                # Start editing
-                layer.beginEditCommand("Process DIGIPIN encoding")
-                
-                # Process features
-                total_features = layer.featureCount()
-                layer_progress = QProgressDialog(
-                    f"Processing {layer.name()}...", 
-                    "Cancel", 
-                    0, 
-                    total_features, 
-                    self.dockwidget)
-                layer_progress.setWindowModality(Qt.WindowModal)
-                
-                feature_count = 0
-                for feature in layer.getFeatures():
-                    if layer_progress.wasCanceled():
-                        layer.destroyEditCommand()
+            failed_count = 0
+            journal = self._open_journal()
+            if journal is None:
+                return
+            try:
+                for i, layer in enumerate(layers):
+                    if progress.wasCanceled():
                         break
                     
-                    geom = feature.geometry()
-                    if geom.isEmpty():
-                        continue
-                    
-                    # Get point based on geometry type
-                    if geom_type == QgsWkbTypes.PointGeometry:
-                        point = geom.asPoint()
-                        note = None
-                    else:  # Polygon geometry
-                        point = geom.pointOnSurface().asPoint()
-                        note = "DIGIPIN generated from point-on-surface"
+                    progress.setValue(i)
+                    QApplication.processEvents()
                     
-                    # Transform if needed
-                    if transform_needed:
-                        point = xform.transform(point)
+                    geom_type = layer.geometryType()
+                    if geom_type not in (QgsWkbTypes.PointGeometry, QgsWkbTypes.PolygonGeometry):
+                        self.dockwidget.statusLabel.setText(self.tr(f"Skipping {layer.name()}: Unsupported geometry type"))
+                        continue
                     
-                    lat, lon = point.y(), point.x()
+                    # Ask for confirmation for polygon layers
+                    if geom_type == QgsWkbTypes.PolygonGeometry:
+                        reply = QMessageBox.question(
+                            self.dockwidget,
+                            "Confirm Processing",
+                            f"This is a polygon layer ({layer.name()}). DIGIPINs will be generated using point-on-surface method.\n\n"
+                            "Would you like to continue?",
+                            QMessageBox.Yes | QMessageBox.No
+                        )
+                        if reply == QMessageBox.No:
+                            continue
                     
-                    # Get DIGIPIN
-                    digipin = self.get_digipin_from_coords(lat, lon)
-                    if not digipin:
-                        continue
+                    # Add new fields if they don't exist
+                    self._add_digipin_fields(layer, geom_type, levels, write_key)
                     
-                    # Update feature attributes
-                    attrs = {}
-                    digipin_idx = layer.fields().indexFromName('digipin')
-                    if digipin_idx != -1:
-                        attrs[digipin_idx] = digipin
-                    lat_idx = layer.fields().indexFromName('latitude')
-                    if lat_idx != -1:
-                        attrs[lat_idx] = lat
-                    lon_idx = layer.fields().indexFromName('longitude')
-                    if lon_idx != -1:
-                        attrs[lon_idx] = lon
-                    map_idx = layer.fields().indexFromName('google_map')
-                    if map_idx != -1:
-                        attrs[map_idx] = f"https://www.google.com/maps?q={lat},{lon}"
-                    if note and layer.fields().indexFromName('digipin_note') != -1:
-                        note_idx = layer.fields().indexFromName('digipin_note')
-                        attrs[note_idx] = note
+                    # Process features as a journaled job
+                    fids, order_keys, ordering = self._job_order(layer, geom_type)
+                    job_id = journal.start_job(layer.id(), self._journal_source(layer), len(fids), levels,
+                                               ordering, write_key)
+                    _, failed, _, _ = self._run_encoding_job(layer, geom_type, fids, journal, job_id,
+                                                             levels, write_key, order_keys)
+                    failed_count += failed
                     
-                    if attrs:
-                        provider.changeAttributeValues({feature.id(): attrs})
-                        feature_count += 1
-                
-                layer_progress.setValue(total_features)
-                layer.endEditCommand()
-                
-                processed_count += 1
+                    processed_count += 1
+            finally:
+                journal.close()
             
             progress.setValue(total_layers)
             
             # Show completion message
-            QMessageBox.information(self.dockwidget, "Batch Processing Complete", 
-                                  f"Successfully processed {processed_count} out of {total_layers} layers")
+            msg = f"Successfully processed {processed_count} out of {total_layers} layers"
+            if failed_count:
+                msg += (f"\n\n{failed_count} features failed and were recorded in the job journal. "
+                        "Use 'Retry Failures' on a layer to process them again.")
+            QMessageBox.information(self.dockwidget, "Batch Processing Complete", msg)
             self.dockwidget.statusLabel.setText(self.tr("Batch processing complete"))
         else:
             self.dockwidget.statusLabel.setText(self.tr("Batch processing canceled"))
 
+    def aggregate_by_cell(self):
+        """Aggregate the active layer per DIGIPIN cell into a new cell polygon layer"""
+        from . import digipin_grid
+        from .digipin_aggregate import CellAggregator, build_cell_layer
+        layer = self._active_encodable_layer()
+        if not layer:
+            return
+        
+        level, ok = QInputDialog.getInt(
+            self.dockwidget,
+            "Aggregate by Cell",
+            "DIGIPIN level of the cells (1-10):",
+            6, 1, digipin_grid.CODE_LENGTH)
+        if not ok:
+            return
+        
+        # Let the user pick the numeric fields to sum and average
+        field_names = []
+        numeric_fields = [field.name() for field in layer.fields() if field.isNumeric()]
+        if numeric_fields:
+            dialog = QDialog(self.dockwidget)
+            dialog.setWindowTitle("Select Fields to Sum and Average")
+            dialog.resize(400, 300)
+            layout = QVBoxLayout()
+            list_widget = QListWidget(dialog)
+            list_widget.setSelectionMode(QAbstractItemView.ExtendedSelection)  # Enable multiple selection
+            list_widget.addItems(numeric_fields)
+            layout.addWidget(list_widget)
+            button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel, dialog)
+            button_box.accepted.connect(dialog.accept)
+            button_box.rejected.connect(dialog.reject)
+            layout.addWidget(button_box)
+            dialog.setLayout(layout)
+            if dialog.exec_() != QDialog.Accepted:
+                return
+            field_names = [item.text() for item in list_widget.selectedItems()]
+        
+        # Stream the layer once, reading only geometry and the selected fields,
+        # and encode cell keys with the local engine
+        geom_type = layer.geometryType()
+        xform = self._wgs84_transform(layer)
+        field_indexes = [layer.fields().indexFromName(name) for name in field_names]
+        request = QgsFeatureRequest().setSubsetOfAttributes(field_indexes)
+        aggregator = CellAggregator(level, len(field_names))
+        
+        total_features = layer.featureCount()
+        progress = QProgressDialog(
+            "Aggregating features...", 
+            "Cancel", 
+            0, 
+            total_features, 
+            self.dockwidget)
+        progress.setWindowTitle("DIGIPIN Aggregation")
+        progress.setWindowModality(Qt.WindowModal)
+        
+        skipped = 0
+        for i, feature in enumerate(layer.getFeatures(request)):
+            if progress.wasCanceled():
+                self.dockwidget.statusLabel.setText(self.tr("Aggregation canceled"))
+                return
+            if i % PROGRESS_INTERVAL == 0:
+                progress.setValue(i)
+                QApplication.processEvents()
+            
+            geom = feature.geometry()
+            if geom.isEmpty():
+                skipped += 1
+                continue
+            point = self._feature_point(geom, geom_type, xform)
+            try:
+                key = digipin_grid.encode_key(point.y(), point.x(), level)
+            except ValueError:  # Outside the DIGIPIN bounding box
+                skipped += 1
+                continue
+            
+            values = []
+            for idx in field_indexes:
+                try:
+                    values.append(float(feature.attribute(idx)))
+                except (TypeError, ValueError):  # NULL or non-numeric value
+                    values.append(None)
+            aggregator.add(key, values)
+        progress.setValue(total_features)
+        
+        cell_layer = build_cell_layer(aggregator, field_names, f"{layer.name()} DIGIPIN level {level} cells")
+        QgsProject.instance().addMapLayer(cell_layer)
+        
+        msg = f"Aggregated {total_features - skipped} features into {len(aggregator)} level {level} cells"
+        if skipped:
+            msg += f"\n\n{skipped} features were skipped (empty geometry or outside the DIGIPIN area)"
+        QMessageBox.information(self.dockwidget, "Aggregation Complete", msg)
+        self.dockwidget.statusLabel.setText(f"Aggregated {layer.name()}")
+
+    def join_by_cell(self):
+        """Join a point layer to a polygon zone layer through DIGIPIN cell keys"""
+        from . import digipin_grid
+        from .digipin_join import ZoneCellIndex
+        all_layers = QgsProject.instance().mapLayers().values()
+        vector_layers = [layer for layer in all_layers if layer.type() == QgsMapLayer.VectorLayer]
+        point_layers = [layer for layer in vector_layers if layer.geometryType() == QgsWkbTypes.PointGeometry]
+        zone_layers = [layer for layer in vector_layers if layer.geometryType() == QgsWkbTypes.PolygonGeometry]
+        
+        if not point_layers or not zone_layers:
+            QMessageBox.warning(self.dockwidget, "Missing Layers", 
+                              "A cell join needs a point layer and a polygon layer in the project")
+            return
+        
+        # Create a dialog to pick the layers and the cell level
+        dialog = QDialog(self.dockwidget)
+        dialog.setWindowTitle("Join Points to Zones by DIGIPIN Cell")
+        layout = QFormLayout()
+        point_combo = QComboBox(dialog)
+        point_combo.addItems([layer.name() for layer in point_layers])
+        layout.addRow("Points:", point_combo)
+        zone_combo = QComboBox(dialog)
+        zone_combo.addItems([layer.name() for layer in zone_layers])
+        layout.addRow("Zones:", zone_combo)
+        level_spin = QSpinBox(dialog)
+        level_spin.setRange(1, digipin_grid.CODE_LENGTH)
+        level_spin.setValue(6)
+        level_spin.setToolTip("Finer levels refine fewer points exactly but index more cells per zone")
+        layout.addRow("DIGIPIN level:", level_spin)
+        reuse_check = QCheckBox("Use the points' existing 'digipin' field", dialog)
+        reuse_check.setChecked(True)
+        layout.addRow(reuse_check)
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel, dialog)
+        button_box.accepted.connect(dialog.accept)
+        button_box.rejected.connect(dialog.reject)
+        layout.addRow(button_box)
+        dialog.setLayout(layout)
+        
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        
+        points = point_layers[point_combo.currentIndex()]
+        zones = zone_layers[zone_combo.currentIndex()]
+        level = level_spin.value()
+        started = time.monotonic()
+        
+        # Index the zones by the cells covering them
+        index = ZoneCellIndex(level)
+        zone_xform = self._wgs84_transform(zones)
+        zone_attributes = {}
+        progress = QProgressDialog(
+            f"Indexing {zones.name()}...", 
+            "Cancel", 
+            0, 
+            zones.featureCount(), 
+            self.dockwidget)
+        progress.setWindowTitle("DIGIPIN Cell Join")
+        progress.setWindowModality(Qt.WindowModal)
+        for i, zone in enumerate(zones.getFeatures()):
+            if progress.wasCanceled():
+                self.dockwidget.statusLabel.setText(self.tr("Cell join canceled"))
+                return
+            progress.setValue(i)
+            QApplication.processEvents()
+            
+            geom = zone.geometry()
+            if zone_xform is not None:
+                geom.transform(zone_xform)
+            index.add_zone(zone.id(), geom)
+            zone_attributes[zone.id()] = zone.attributes()
+        
+        # Output layer with the point fields followed by the zone fields
+        output = QgsVectorLayer(
+            f"{QgsWkbTypes.displayString(points.wkbType())}?crs={points.crs().authid()}",
+            f"{points.name()} joined to {zones.name()}",
+            "memory")
+        out_fields = [QgsField(field) for field in points.fields()]
+        point_names = set(points.fields().names())
+        for field in zones.fields():
+            zone_field = QgsField(field)
+            if zone_field.name() in point_names:
+                zone_field.setName(f"zone_{zone_field.name()}")
+            out_fields.append(zone_field)
+        provider = output.dataProvider()
+        provider.addAttributes(out_fields)
+        output.updateFields()
+        
+        # Stream the points and probe the index with their cell keys
+        point_xform = self._wgs84_transform(points)
+        digipin_idx = points.fields().indexFromName('digipin') if reuse_check.isChecked() else -1
+        total_features = points.featureCount()
+        progress.setLabelText(f"Joining {points.name()}...")
+        progress.setMaximum(total_features)
+        
+        joined_count = 0
+        batch = []
+        for i, feature in enumerate(points.getFeatures()):
+            if progress.wasCanceled():
+                self.dockwidget.statusLabel.setText(self.tr("Cell join canceled"))
+                return
+            if i % PROGRESS_INTERVAL == 0:
+                progress.setValue(i)
+                QApplication.processEvents()
+            
+            geom = feature.geometry()
+            if geom.isEmpty():
+                continue
+            point = self._feature_point(geom, QgsWkbTypes.PointGeometry, point_xform)
+            lat, lon = point.y(), point.x()
+            
+            key = None
+            if digipin_idx != -1:
+                code = feature.attribute(digipin_idx)
+                if isinstance(code, str) and len(code.replace('-', '')) >= level:
+                    try:
+                        key = digipin_grid.pack(code.replace('-', '')[:level])
+                    except ValueError:  # Not a DIGIPIN; encode the point instead
+                        pass
+            if key is None:
+                try:
+                    key = digipin_grid.encode_key(lat, lon, level)
+                except ValueError:  # Outside the DIGIPIN bounding box
+                    continue
+            
+            for zone_id in index.match(key, lat, lon):
+                joined = QgsFeature(output.fields())
+                joined.setGeometry(geom)
+                joined.setAttributes(feature.attributes() + zone_attributes[zone_id])
+                batch.append(joined)
+            if len(batch) >= PROGRESS_INTERVAL:
+                provider.addFeatures(batch)
+                joined_count += len(batch)
+                batch = []
+        if batch:
+            provider.addFeatures(batch)
+            joined_count += len(batch)
+        progress.setValue(total_features)
+        
+        output.updateExtents()
+        QgsProject.instance().addMapLayer(output)
+        
+        elapsed = time.monotonic() - started
+        QMessageBox.information(
+            self.dockwidget, 
+            "Cell Join Complete", 
+            f"Joined {joined_count} point-zone pairs in {elapsed:.1f} s.\n\n"
+            f"Zones were indexed with {index.cell_count} cells; {index.boundary_tests} "
+            "point-in-polygon tests were needed for points in boundary cells.")
+        self.dockwidget.statusLabel.setText(f"Joined {points.name()} to {zones.name()}")
+
     def copy_to_clipboard(self):
         """Copy current DIGIPIN information to clipboard"""
         digipin = self.dockwidget.digipinLineEdit.text()
@@ -691,16 +1376,20 @@ class DIGIPIN_ENCODER:
 
     def decode_digipin(self):
         """Decode a DIGIPIN to coordinates using API"""
+        import requests
+        from . import digipin_grid
         digipin = self.dockwidget.decodeDigipinLineEdit.text().strip()
         if not digipin:
             self.dockwidget.statusLabel.setText(self.tr("Please enter a DIGIPIN to decode"))
             return
         
-        # Validate DIGIPIN format (3-3-4 segments with hyphens)
-        if not re.match(r'^[A-Z0-9]{3}-[A-Z0-9]{3}-[A-Z0-9]{4}$', digipin):
+        # Validate DIGIPIN locally (alphabet, length and hyphen placement)
+        valid, reason = digipin_grid.validate(digipin)
+        if not valid:
             QMessageBox.warning(self.dockwidget, "Invalid DIGIPIN", 
-                              "DIGIPIN must be in the format XXX-XXX-XXXX (e.g., 469-999-3CPM)")
+                              f"{reason}.\n\nDIGIPIN must be in the format XXX-XXX-XXXX (e.g., 469-999-3CPM)")
             return
+        digipin = digipin.upper()
         
         try:
             url = f"{self.api_base}/api/digipin/decode"
@@ -758,105 +1447,133 @@ class DIGIPIN_ENCODER:
             print(f"Unexpected Error: {str(e)}")
 
     def validate_digipin(self):
-        """Validate a DIGIPIN using API and zoom map to location"""
+        """Validate a DIGIPIN locally and zoom map to location"""
+        from . import digipin_grid
         digipin = self.dockwidget.decodeDigipinLineEdit.text().strip()
         if not digipin:
             self.dockwidget.statusLabel.setText(self.tr("Please enter a DIGIPIN to validate"))
             return
         
-        # Validate DIGIPIN format (3-3-4 segments with hyphens)
-        if not re.match(r'^[A-Z0-9]{3}-[A-Z0-9]{3}-[A-Z0-9]{4}$', digipin):
+        # Check alphabet, length and hyphen placement without an API round trip
+        valid, reason = digipin_grid.validate(digipin)
+        if not valid:
             QMessageBox.warning(self.dockwidget, "Invalid DIGIPIN", 
-                              "DIGIPIN must be in the format XXX-XXX-XXXX (e.g., 469-999-3CPM)")
+                              f"{reason}.\n\nDIGIPIN must be in the format XXX-XXX-XXXX (e.g., 469-999-3CPM)")
             return
         
-        try:
-            url = f"{self.api_base}/api/digipin/decode"
-            print(f"Validating DIGIPIN from: {url} with digipin={digipin}")  # Debug log
-            payload = {"digipin": digipin.replace('-', '')}
-            headers = {"Content-Type": "application/json"}
-            if self.api_key:
-                headers["x-api-key"] = self.api_key
+        digipin = digipin_grid.format_digipin(digipin.strip().upper().replace('-', ''))
+        lat, lon = digipin_grid.decode(digipin)
+        
+        # Update UI with validation results
+        self.dockwidget.decodeDigipinLineEdit.setText(digipin)
+        self.dockwidget.latLineEdit.setText(f"{lat:.6f}")
+        self.dockwidget.lonLineEdit.setText(f"{lon:.6f}")
+        self.dockwidget.mapLinkLineEdit.setText(f"https://www.google.com/maps?q={lat},{lon}")
+        self.dockwidget.statusLabel.setText(self.tr("DIGIPIN validated successfully"))
 
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
-            response.raise_for_status()
+        # Enable buttons
+        self.dockwidget.copyAllButton.setEnabled(True)
+        self.dockwidget.openMapButton.setEnabled(True)
+        self.dockwidget.copyDigipinButton.setEnabled(True)
+        self.dockwidget.copyLatButton.setEnabled(True)
+        self.dockwidget.copyLonButton.setEnabled(True)
+        self.dockwidget.copyMapButton.setEnabled(True)
 
-            # Preprocess and parse response
-            raw_response = response.text
-            if raw_response.startswith('(') and raw_response.endswith(')'):
-                raw_response = '{' + raw_response[1:-1] + '}'  # Convert (key:value,...) to {key:value,...}
-            try:
-                data = response.json() if not raw_response.startswith('{') else eval(raw_response)  # Fallback to eval for malformed JSON
-            except ValueError:
-                import json
-                # Attempt to parse as a string with key-value pairs
-                data = {}
-                pairs = raw_response.strip('()').split(',')
-                for pair in pairs:
-                    if ':' in pair:
-                        key, value = pair.split(':', 1)
-                        data[key.strip('"')] = value.strip('"')
-            
-            lat = data.get("latitude")
-            lon = data.get("longitude")
-            if lat is not None and lon is not None:
-                # Update UI with validation results
-                self.dockwidget.decodeDigipinLineEdit.setText(digipin)  # Keep original DIGIPIN
-                self.dockwidget.latLineEdit.setText(f"{float(lat):.6f}")
-                self.dockwidget.lonLineEdit.setText(f"{float(lon):.6f}")
-                self.dockwidget.mapLinkLineEdit.setText(f"https://www.google.com/maps?q={float(lat)},{float(lon)}")
-                self.dockwidget.statusLabel.setText(self.tr("DIGIPIN validated successfully"))
+        # Zoom map to location
+        canvas = self.iface.mapCanvas()
+        canvas_crs = canvas.mapSettings().destinationCrs()
+        point = QgsPointXY(lon, lat)
+        if canvas_crs.authid() != 'EPSG:4326':
+            transform_context = QgsProject.instance().transformContext()
+            xform = QgsCoordinateTransform(
+                QgsCoordinateReferenceSystem('EPSG:4326'),
+                canvas_crs,
+                transform_context)
+            point = xform.transform(point)
 
-                # Enable buttons
-                self.dockwidget.copyAllButton.setEnabled(True)
-                self.dockwidget.openMapButton.setEnabled(True)
-                self.dockwidget.copyDigipinButton.setEnabled(True)
-                self.dockwidget.copyLatButton.setEnabled(True)
-                self.dockwidget.copyLonButton.setEnabled(True)
-                self.dockwidget.copyMapButton.setEnabled(True)
+        # Remove existing validation marker
+        self.clear_validation_marker()
 
-                # Zoom map to location
-                canvas = self.iface.mapCanvas()
-                canvas_crs = canvas.mapSettings().destinationCrs()
-                point = QgsPointXY(float(lon), float(lat))
-                if canvas_crs.authid() != 'EPSG:4326':
-                    transform_context = QgsProject.instance().transformContext()
-                    xform = QgsCoordinateTransform(
-                        QgsCoordinateReferenceSystem('EPSG:4326'),
-                        canvas_crs,
-                        transform_context)
-                    point = xform.transform(point)
+        # Add new validation marker
+        self.validation_marker = QgsVertexMarker(canvas)
+        self.validation_marker.setCenter(point)
+        self.validation_marker.setColor(Qt.green)
+        self.validation_marker.setIconSize(12)
+        self.validation_marker.setPenWidth(2)
 
-                # Remove existing validation marker
-                self.clear_validation_marker()
-
-                # Add new validation marker
-                self.validation_marker = QgsVertexMarker(canvas)
-                self.validation_marker.setCenter(point)
-                self.validation_marker.setColor(Qt.green)
-                self.validation_marker.setIconSize(12)
-                self.validation_marker.setPenWidth(2)
-
-                # Center and zoom the map
-                canvas.setCenter(point)
-                canvas.zoomScale(1000)  # Approximate zoom level 16
-                canvas.refresh()
-                print(f"Map centered at {lat}, {lon} with zoom scale 1000")  # Debug log
-            else:
-                self.dockwidget.statusLabel.setText(self.tr("Invalid DIGIPIN or no coordinates returned"))
-                print("API returned no valid coordinates")  # Debug log
-        except requests.exceptions.HTTPError as e:
-            self.dockwidget.statusLabel.setText(self.tr(f"API Error: {str(e)}"))
-            print(f"HTTP Error: {str(e)}")  # Debug log
-        except requests.exceptions.RequestException as e:
-            self.dockwidget.statusLabel.setText(self.tr(f"API Connection Error: {str(e)}"))
-            print(f"Connection Error: {str(e)}")  # Debug log
-        except ValueError as e:
-            self.dockwidget.statusLabel.setText(self.tr(f"API Response Error: Invalid JSON - {str(e)}. Raw response: {response.text}"))
-            print(f"JSON Error: {str(e)} with response: {response.text}")  # Debug log with raw response
-        except Exception as e:
-            self.dockwidget.statusLabel.setText(self.tr(f"Unexpected error: {str(e)}"))
-            print(f"Unexpected Error: {str(e)}")  # Debug log
+        # Center and zoom the map
+        canvas.setCenter(point)
+        canvas.zoomScale(1000)  # Approximate zoom level 16
+        canvas.refresh()
+        print(f"Map centered at {lat}, {lon} with zoom scale 1000")  # Debug log
+
+    def validate_digipin_column(self):
+        """Validate a DIGIPIN field of the active layer and flag each feature with the result"""
+        from . import digipin_grid
+        layer = self.iface.activeLayer()
+        if not layer or layer.type() != QgsMapLayer.VectorLayer:
+            QMessageBox.warning(self.dockwidget, "No Layer", "Please select a vector layer first")
+            return
+        
+        text_fields = [field.name() for field in layer.fields()
+                       if field.type() == QVariant.String and field.name() != 'digipin_reason']
+        if not text_fields:
+            QMessageBox.warning(self.dockwidget, "No Text Fields", 
+                              "The active layer has no text field holding DIGIPINs")
+            return
+        
+        default = text_fields.index('digipin') if 'digipin' in text_fields else 0
+        field_name, ok = QInputDialog.getItem(
+            self.dockwidget, 
+            "Validate DIGIPIN Column", 
+            "Field holding the DIGIPINs:", 
+            text_fields, 
+            default, 
+            False)
+        if not ok:
+            return
+        
+        # Add the result fields if they don't exist
+        fields_to_add = []
+        if layer.fields().indexFromName('digipin_valid') == -1:
+            fields_to_add.append(QgsField('digipin_valid', QVariant.Int))
+        if layer.fields().indexFromName('digipin_reason') == -1:
+            fields_to_add.append(QgsField('digipin_reason', QVariant.String, len=100))
+        if fields_to_add:
+            layer.beginEditCommand("Add DIGIPIN validation fields")
+            layer.dataProvider().addAttributes(fields_to_add)
+            layer.updateFields()
+            layer.endEditCommand()
+        
+        # Read only the code column, no geometry
+        field_idx = layer.fields().indexFromName(field_name)
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)
+        request.setSubsetOfAttributes([field_idx])
+        fids = []
+        codes = []
+        for feature in layer.getFeatures(request):
+            value = feature.attribute(field_idx)
+            fids.append(feature.id())
+            codes.append(value if isinstance(value, str) else None)
+        
+        # Validate the whole column at once and write the flags in chunks
+        valid, reasons = digipin_grid.validate_batch(codes)
+        valid_idx = layer.fields().indexFromName('digipin_valid')
+        reason_idx = layer.fields().indexFromName('digipin_reason')
+        provider = layer.dataProvider()
+        for start in range(0, len(fids), WRITE_CHUNK):
+            provider.changeAttributeValues({
+                fid: {valid_idx: int(valid[i]), reason_idx: reasons[i]}
+                for i, fid in enumerate(fids[start:start + WRITE_CHUNK], start)})
+        layer.triggerRepaint()
+        
+        invalid_count = len(fids) - int(valid.sum())
+        QMessageBox.information(
+            self.dockwidget, 
+            "Validation Complete", 
+            f"Checked {len(fids)} values of '{field_name}': {invalid_count} invalid.\n\n"
+            "Results were written to the 'digipin_valid' and 'digipin_reason' fields.")
+        self.dockwidget.statusLabel.setText(f"Validated {layer.name()}")
 
     def open_in_maps(self):
         """Open current location in Google Maps"""
@@ -0,0 +1,456 @@
+# DIGIPIN ENCODER - A QGIS plugin for encoding and decoding DIGIPINs using India Post's API
+# Copyright (C) 2025 Beig Mehaboob
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Local DIGIPIN engine.
+
+Implements India Post's open-source DIGIPIN grid (the same algorithm the API
+runs): the bounding box is split into a 4x4 grid ten times and each level
+contributes one symbol of the code.
+"""
+import math
+
+# Symbol of each (row, column) cell; row 0 is the northern row
+DIGIPIN_GRID = (
+    ('F', 'C', '9', '8'),
+    ('J', '3', '2', '7'),
+    ('K', '4', '5', '6'),
+    ('L', 'M', 'P', 'T'),
+)
+
+MIN_LAT = 2.5
+MAX_LAT = 38.5
+MIN_LON = 63.5
+MAX_LON = 99.5
+
+CODE_LENGTH = 10
+
+# (row, column) of each symbol
+SYMBOL_POSITIONS = {symbol: (row, col)
+                    for row, symbols in enumerate(DIGIPIN_GRID)
+                    for col, symbol in enumerate(symbols)}
+
+# Symbols in (row, column) order, i.e. indexed by 4 * row + column
+SYMBOLS = ''.join(''.join(symbols) for symbols in DIGIPIN_GRID)
+
+# 4-bit index of each symbol in SYMBOLS
+SYMBOL_INDEXES = {symbol: index for index, symbol in enumerate(SYMBOLS)}
+
+
+def format_digipin(symbols):
+    """Return a code in the hyphenated XXX-XXX-XXXX display form"""
+    parts = [symbols[:3], symbols[3:6], symbols[6:]]
+    return '-'.join(part for part in parts if part)
+
+
+def encode(lat, lon, level=CODE_LENGTH):
+    """Encode WGS84 coordinates as a hyphenated DIGIPIN, or its prefix of the given level"""
+    return unpack(encode_key(lat, lon, level), level)
+
+
+def encode_key(lat, lon, level=CODE_LENGTH):
+    """Encode WGS84 coordinates as the packed key of their cell at the given level"""
+    if not (MIN_LAT <= lat <= MAX_LAT and MIN_LON <= lon <= MAX_LON):
+        raise ValueError(f"Coordinates ({lat}, {lon}) are outside the DIGIPIN bounding box")
+
+    min_lat, max_lat, min_lon, max_lon = MIN_LAT, MAX_LAT, MIN_LON, MAX_LON
+    key = 0
+    for _ in range(level):
+        lat_div = (max_lat - min_lat) / 4
+        lon_div = (max_lon - min_lon) / 4
+        row = min(max(3 - math.floor((lat - min_lat) / lat_div), 0), 3)
+        col = min(max(math.floor((lon - min_lon) / lon_div), 0), 3)
+        key = (key << 4) | (row << 2) | col
+
+        max_lat = min_lat + lat_div * (4 - row)
+        min_lat = min_lat + lat_div * (3 - row)
+        min_lon = min_lon + lon_div * col
+        max_lon = min_lon + lon_div
+    return key
+
+
+def decode_bounds(code):
+    """Return the (min_lat, min_lon, max_lat, max_lon) cell of a DIGIPIN or DIGIPIN prefix"""
+    min_lat, max_lat, min_lon, max_lon = MIN_LAT, MAX_LAT, MIN_LON, MAX_LON
+    for symbol in code.replace('-', ''):
+        if symbol not in SYMBOL_POSITIONS:
+            raise ValueError(f"Invalid DIGIPIN symbol: {symbol!r}")
+        row, col = SYMBOL_POSITIONS[symbol]
+        lat_div = (max_lat - min_lat) / 4
+        lon_div = (max_lon - min_lon) / 4
+        max_lat, min_lat = max_lat - lat_div * row, max_lat - lat_div * (row + 1)
+        min_lon, max_lon = min_lon + lon_div * col, min_lon + lon_div * (col + 1)
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def decode(code):
+    """Decode a DIGIPIN to the (lat, lon) centre of its cell"""
+    min_lat, min_lon, max_lat, max_lon = decode_bounds(code)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+# Packed keys.
+#
+# A symbol is a 4-bit index (4 * row + column), so a code of level L packs
+# into a 4L-bit integer, 40 bits for a full DIGIPIN, with the first symbol in
+# the highest bits. Sorting keys of one level orders cells hierarchically
+# (the cells of a parent are contiguous, Z-order-like), the cells under a
+# prefix form one key range and a parent is a right shift. A key does not
+# record its level ('F' is symbol 0), so keys are always used with one.
+
+def pack(code):
+    """Pack a DIGIPIN or DIGIPIN prefix into an integer key"""
+    key = 0
+    for symbol in code.replace('-', ''):
+        try:
+            key = (key << 4) | SYMBOL_INDEXES[symbol]
+        except KeyError:
+            raise ValueError(f"Invalid DIGIPIN symbol: {symbol!r}") from None
+    return key
+
+
+def unpack(key, level=CODE_LENGTH):
+    """Return the hyphenated code of a packed key of the given level"""
+    return format_digipin(''.join(SYMBOLS[(key >> shift) & 15]
+                                  for shift in range(4 * (level - 1), -1, -4)))
+
+
+def parent_key(key, level, key_level=CODE_LENGTH):
+    """Return the key of the enclosing cell at level of a key of key_level"""
+    return key >> (4 * (key_level - level))
+
+
+def prefix_range(prefix, level=CODE_LENGTH):
+    """Return the [low, high) range of the level keys of all cells under a prefix"""
+    shift = 4 * (level - len(prefix.replace('-', '')))
+    key = pack(prefix)
+    return key << shift, (key + 1) << shift
+
+
+# Grid-index queries.
+#
+# At level L the DIGIPIN area is a 4**L x 4**L grid of cells. A code is the
+# base-4 digits of its cell's row (counted from the northern edge) and column
+# interleaved into symbols, so adjacency and hierarchy queries are integer
+# arithmetic on (row, col) with no geometry involved.
+
+# (row, column) offsets of the neighbours, clockwise from north
+NEIGHBOR_OFFSETS = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+
+
+def cell_indices(code):
+    """Return (row, col, level) of the cell of a DIGIPIN or DIGIPIN prefix"""
+    row = col = 0
+    symbols = code.replace('-', '')
+    for symbol in symbols:
+        try:
+            symbol_row, symbol_col = SYMBOL_POSITIONS[symbol]
+        except KeyError:
+            raise ValueError(f"Invalid DIGIPIN symbol: {symbol!r}") from None
+        row = row * 4 + symbol_row
+        col = col * 4 + symbol_col
+    return row, col, len(symbols)
+
+
+# Two-symbol strings indexed by 16 * (4-bit row) + (4-bit column), covering two levels at once
+_PAIR_SYMBOLS = [DIGIPIN_GRID[row >> 2][col >> 2] + DIGIPIN_GRID[row & 3][col & 3]
+                 for row in range(16) for col in range(16)]
+
+
+def cell_code(row, col, level):
+    """Return the code of the cell at (row, col) of the given level"""
+    symbols = [_PAIR_SYMBOLS[(((row >> shift) & 15) << 4) | ((col >> shift) & 15)]
+               for shift in range(2 * (level - 2), -1, -4)]
+    if level % 2:
+        symbols.append(DIGIPIN_GRID[row & 3][col & 3])
+    return format_digipin(''.join(symbols))
+
+
+def neighbors(code):
+    """Return the codes of the up to 8 cells adjacent to a cell, clockwise from north.
+
+    Cells on the edge of the DIGIPIN area have fewer neighbours.
+    """
+    row, col, level = cell_indices(code)
+    size = 4 ** level
+    return [cell_code(row + d_row, col + d_col, level)
+            for d_row, d_col in NEIGHBOR_OFFSETS
+            if 0 <= row + d_row < size and 0 <= col + d_col < size]
+
+
+def k_ring(code, k):
+    """Return the codes of all cells within k cells of a cell (itself included), row by row"""
+    if k < 0:
+        raise ValueError(f"k must not be negative, got {k}")
+    row, col, level = cell_indices(code)
+    size = 4 ** level
+    return [cell_code(r, c, level)
+            for r in range(max(row - k, 0), min(row + k, size - 1) + 1)
+            for c in range(max(col - k, 0), min(col + k, size - 1) + 1)]
+
+
+def parent(code, level=None):
+    """Return the enclosing cell of a code at the given level (by default one level up)"""
+    symbols = code.replace('-', '')
+    if level is None:
+        level = len(symbols) - 1
+    if not 1 <= level <= len(symbols):
+        raise ValueError(f"Level {level} is not between 1 and the level of {code}")
+    return format_digipin(symbols[:level])
+
+
+def children(code):
+    """Return the 16 cells one level below a cell, in grid order"""
+    symbols = code.replace('-', '')
+    if len(symbols) >= CODE_LENGTH:
+        raise ValueError(f"{code} is a full DIGIPIN and has no children")
+    return [format_digipin(symbols + symbol) for symbol in SYMBOLS]
+
+
+# Batch variants over arrays of packed keys of one level. The *_keys
+# functions stay on int64 key arrays, with OUTSIDE_KEY where a cell would lie
+# outside the DIGIPIN area; the *_batch functions take and return codes and
+# only convert to strings at the ends. NumPy is only imported when used.
+
+# Key of the cells outside the DIGIPIN area in key arrays
+OUTSIDE_KEY = -1
+
+
+def pack_batch(codes):
+    """Pack a sequence of codes of the same level; returns (int64 key array, level)"""
+    import numpy as np
+
+    stripped = [code.replace('-', '') for code in codes]
+    level = len(stripped[0]) if stripped else CODE_LENGTH
+    if any(len(symbols) != level for symbols in stripped):
+        raise ValueError("Batch queries need codes of the same level")
+
+    lookup = np.full(256, -1, dtype=np.int64)
+    for index, symbol in enumerate(SYMBOLS):
+        lookup[ord(symbol)] = index
+    raw = np.frombuffer(''.join(stripped).encode('ascii', 'replace'), dtype=np.uint8)
+    symbol_indexes = lookup[raw].reshape(len(stripped), level)
+    if (symbol_indexes < 0).any():
+        raise ValueError("Batch contains invalid DIGIPIN symbols")
+
+    shifts = np.arange(4 * (level - 1), -1, -4, dtype=np.int64)
+    return (symbol_indexes << shifts).sum(axis=1), level
+
+
+def unpack_batch(keys, level=CODE_LENGTH):
+    """Return the hyphenated codes of an array of packed keys of one level"""
+    import numpy as np
+
+    keys = np.asarray(keys, dtype=np.int64).ravel()
+    shifts = np.arange(4 * (level - 1), -1, -4, dtype=np.int64)
+    symbol_bytes = np.frombuffer(SYMBOLS.encode('ascii'), dtype=np.uint8)
+    raw = symbol_bytes[(keys[:, None] >> shifts) & 15]
+    # Hyphen columns placed as by format_digipin()
+    hyphens = [position for position in (3, 6) if position < level]
+    raw = np.insert(raw, hyphens, ord('-'), axis=1)
+    width = raw.shape[1]
+    text = raw.tobytes().decode('ascii')
+    return [text[start:start + width] for start in range(0, len(text), width)]
+
+
+def key_indices(keys, level):
+    """Return the (rows, cols) arrays of the cells of an array of keys of one level"""
+    import numpy as np
+
+    keys = np.asarray(keys, dtype=np.int64)
+    rows = np.zeros(keys.shape, dtype=np.int64)
+    cols = np.zeros(keys.shape, dtype=np.int64)
+    for shift in range(4 * (level - 1), -1, -4):
+        symbol_indexes = (keys >> shift) & 15
+        rows = (rows << 2) | (symbol_indexes >> 2)
+        cols = (cols << 2) | (symbol_indexes & 3)
+    return rows, cols
+
+
+def index_keys(rows, cols, level):
+    """Return the keys of cells given as row and column arrays of one level, OUTSIDE_KEY off the grid"""
+    import numpy as np
+
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    keys = np.zeros(rows.shape, dtype=np.int64)
+    for shift in range(2 * (level - 1), -1, -2):
+        keys = (keys << 4) | (((rows >> shift) & 3) << 2) | ((cols >> shift) & 3)
+    size = 4 ** level
+    inside = (rows >= 0) & (rows < size) & (cols >= 0) & (cols < size)
+    return np.where(inside, keys, OUTSIDE_KEY)
+
+
+def _offset_keys(keys, level, offsets):
+    """Return an (n, len(offsets)) array of the keys of the cells at (row, col) offsets of each key"""
+    import numpy as np
+
+    rows, cols = key_indices(keys, level)
+    offsets = np.asarray(offsets, dtype=np.int64).reshape(-1, 2)
+    return index_keys(rows[:, None] + offsets[:, 0], cols[:, None] + offsets[:, 1], level)
+
+
+def neighbor_keys(keys, level):
+    """Return an (n, 8) array of the neighbour keys of each key, clockwise from north"""
+    return _offset_keys(keys, level, NEIGHBOR_OFFSETS)
+
+
+def k_ring_keys(keys, level, k):
+    """Return an (n, (2k + 1)**2) array of the keys within k cells of each key, row by row"""
+    if k < 0:
+        raise ValueError(f"k must not be negative, got {k}")
+    offsets = [(d_row, d_col) for d_row in range(-k, k + 1) for d_col in range(-k, k + 1)]
+    return _offset_keys(keys, level, offsets)
+
+
+def parent_keys(keys, level, key_level=CODE_LENGTH):
+    """parent_key() of each key of an array of keys of key_level"""
+    import numpy as np
+
+    if not 1 <= level <= key_level:
+        raise ValueError(f"Level {level} is not between 1 and {key_level}")
+    return np.asarray(keys, dtype=np.int64) >> (4 * (key_level - level))
+
+
+def children_keys(keys, level):
+    """Return an (n, 16) array of the keys one level below each key, in grid order"""
+    import numpy as np
+
+    if level >= CODE_LENGTH:
+        raise ValueError("Full DIGIPINs have no children")
+    return (np.asarray(keys, dtype=np.int64)[:, None] << 4) | np.arange(16, dtype=np.int64)
+
+
+def _group_codes(keys, level):
+    """Return the codes of each row of a key array as lists, leaving out OUTSIDE_KEY cells"""
+    import numpy as np
+
+    inside = keys != OUTSIDE_KEY
+    codes = unpack_batch(np.where(inside, keys, 0), level)
+    width = keys.shape[1]
+    groups = [codes[start:start + width] for start in range(0, len(codes), width)]
+    # Only cells on the edge of the area have missing neighbours
+    for row in np.flatnonzero(~inside.all(axis=1)):
+        groups[row] = [code for code, found in zip(groups[row], inside[row]) if found]
+    return groups
+
+
+def neighbors_batch(codes):
+    """neighbors() of each code of a sequence of codes of the same level"""
+    keys, level = pack_batch(codes)
+    return _group_codes(neighbor_keys(keys, level), level)
+
+
+def k_ring_batch(codes, k):
+    """k_ring() of each code of a sequence of codes of the same level"""
+    keys, level = pack_batch(codes)
+    return _group_codes(k_ring_keys(keys, level, k), level)
+
+
+def parent_batch(codes, level=None):
+    """parent() of each code of a sequence of codes of the same level"""
+    keys, key_level = pack_batch(codes)
+    if level is None:
+        level = key_level - 1
+    return unpack_batch(parent_keys(keys, level, key_level), level)
+
+
+def children_batch(codes):
+    """children() of each code of a sequence of codes of the same level"""
+    keys, level = pack_batch(codes)
+    return _group_codes(children_keys(keys, level), level + 1)
+
+
+# Validation without network calls
+
+def validate(code, bounds=None):
+    """Check a DIGIPIN locally, returning (valid, reason) with reason None for valid codes.
+
+    Accepts hyphenated (XXX-XXX-XXXX) and unhyphenated codes, ignoring case
+    and surrounding spaces. bounds is an optional (min_lat, min_lon, max_lat,
+    max_lon) box the cell centre must fall in; every well-formed code lies in
+    the DIGIPIN bounding box.
+    """
+    symbols, reason = _normalize(code)
+    if reason is None:
+        for symbol in symbols:
+            if symbol not in SYMBOL_INDEXES:
+                return False, f"Invalid symbol {symbol!r}"
+        if bounds is not None:
+            lat, lon = decode(symbols)
+            if not (bounds[0] <= lat <= bounds[2] and bounds[1] <= lon <= bounds[3]):
+                return False, "Outside bounds"
+    return reason is None, reason
+
+
+def _normalize(code):
+    """Return (symbols, reason) with the unhyphenated symbols of a code, or an error reason"""
+    symbols = code.strip().upper() if code is not None else ''
+    if not symbols:
+        return None, "Empty"
+    if '-' in symbols:
+        if len(symbols) != CODE_LENGTH + 2 or symbols[3] != '-' or symbols[7] != '-':
+            return None, "Hyphens must be placed as XXX-XXX-XXXX"
+        symbols = symbols.replace('-', '')
+    if len(symbols) != CODE_LENGTH:
+        return None, f"Expected {CODE_LENGTH} symbols, got {len(symbols)}"
+    return symbols, None
+
+
+def validate_batch(codes, bounds=None):
+    """validate() over a whole column of codes (None for nulls).
+
+    The length and hyphen checks run per code; the alphabet and bounds checks
+    are vectorised with NumPy over all well-formed codes at once. Returns a
+    NumPy bool array of validity and a list of reasons (None where valid).
+    """
+    import numpy as np
+
+    reasons = []
+    rows = []
+    candidates = []
+    for row, code in enumerate(codes):
+        symbols, reason = _normalize(code)
+        reasons.append(reason)
+        if reason is None:
+            rows.append(row)
+            candidates.append(symbols)
+
+    if candidates:
+        lookup = np.full(256, -1, dtype=np.int64)
+        for index, symbol in enumerate(SYMBOLS):
+            lookup[ord(symbol)] = index
+        raw = np.frombuffer(''.join(candidates).encode('ascii', 'replace'), dtype=np.uint8)
+        symbol_indexes = lookup[raw].reshape(len(candidates), CODE_LENGTH)
+
+        invalid = (symbol_indexes < 0).any(axis=1)
+        for candidate in np.flatnonzero(invalid):
+            symbols = candidates[candidate]
+            reasons[rows[candidate]] = "Invalid symbol {!r}".format(
+                next(symbol for symbol in symbols if symbol not in SYMBOL_INDEXES))
+
+        if bounds is not None:
+            digit_shifts = np.arange(2 * (CODE_LENGTH - 1), -1, -2, dtype=np.int64)
+            cell_rows = ((np.maximum(symbol_indexes, 0) >> 2) << digit_shifts).sum(axis=1)
+            cell_cols = ((np.maximum(symbol_indexes, 0) & 3) << digit_shifts).sum(axis=1)
+            cells = 4 ** CODE_LENGTH
+            lats = MAX_LAT - (cell_rows + 0.5) * ((MAX_LAT - MIN_LAT) / cells)
+            lons = MIN_LON + (cell_cols + 0.5) * ((MAX_LON - MIN_LON) / cells)
+            outside = ~invalid & ((lats < bounds[0]) | (lats > bounds[2]) |
+                                  (lons < bounds[1]) | (lons > bounds[3]))
+            for candidate in np.flatnonzero(outside):
+                reasons[rows[candidate]] = "Outside bounds"
+
+    valid = np.fromiter((reason is None for reason in reasons), dtype=bool, count=len(reasons))
+    return valid, reasons
@@ -0,0 +1,168 @@
+# DIGIPIN ENCODER - A QGIS plugin for encoding and decoding DIGIPINs using India Post's API
+# Copyright (C) 2025 Beig Mehaboob
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    layer_id TEXT NOT NULL,
+    layer_source TEXT,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    last_fid INTEGER,
+    levels TEXT,
+    ordering TEXT,
+    last_key INTEGER,
+    digipin_key INTEGER,
+    started REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failures (
+    job_id INTEGER NOT NULL,
+    fid INTEGER NOT NULL,
+    reason TEXT,
+    recorded REAL NOT NULL,
+    PRIMARY KEY (job_id, fid)
+);
+"""
+
+# Job states; 'running' jobs left behind by a crash are resumable like canceled ones
+STATUS_RUNNING = 'running'
+STATUS_CANCELED = 'canceled'
+STATUS_COMPLETE = 'complete'
+
+# Feature orders; spatial jobs checkpoint the order key of their last fid too
+ORDER_FID = 'fid'
+ORDER_SPATIAL = 'spatial'
+
+# Columns added to the jobs table after its first release
+ADDED_COLUMNS = (('levels', 'TEXT'), ('ordering', 'TEXT'), ('last_key', 'INTEGER'),
+                 ('digipin_key', 'INTEGER'))
+
+
+class JobJournal:
+    """SQLite journal of layer encoding jobs, their checkpoints and failed features"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        try:
+            self.conn.executescript(SCHEMA)
+            # Journals written by older versions lack the added columns
+            columns = [row['name'] for row in self.conn.execute("PRAGMA table_info(jobs)")]
+            with self.conn:
+                for name, column_type in ADDED_COLUMNS:
+                    if name not in columns:
+                        self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {column_type}")
+            # Fail here rather than mid-job when the file is readable but not writable
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.rollback()
+        except sqlite3.Error:
+            self.conn.close()
+            raise
+
+    def close(self):
+        self.conn.close()
+
+    def start_job(self, layer_id, layer_source, total, levels, ordering=ORDER_FID, write_key=False):
+        """Register a new job writing the given DIGIPIN levels (and digipin_key if write_key) and return its id"""
+        now = time.time()
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (layer_id, layer_source, status, total, levels, ordering, digipin_key, "
+                "started, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (layer_id, layer_source, STATUS_RUNNING, total,
+                 ','.join(str(level) for level in levels), ordering, int(write_key), now, now))
+        return cursor.lastrowid
+
+    def latest_job(self, layer_id, layer_source):
+        """Return the most recent job of a layer, or None.
+
+        Jobs are matched by layer id or, since a layer re-added after a crash
+        gets a new id, by data source. Only the latest job counts: a newer run
+        supersedes the checkpoint and failures of older ones.
+        """
+        return self.conn.execute(
+            "SELECT * FROM jobs WHERE layer_id = ? OR (? != '' AND layer_source = ?) "
+            "ORDER BY job_id DESC LIMIT 1",
+            (layer_id, layer_source or '', layer_source or '')).fetchone()
+
+    def latest_job_with_failures(self, layer_id, layer_source):
+        """Return the latest job of a layer if it still has failed features, or None"""
+        job = self.latest_job(layer_id, layer_source)
+        if job is None or self.conn.execute(
+                "SELECT 1 FROM failures WHERE job_id = ? LIMIT 1", (job['job_id'],)).fetchone() is None:
+            return None
+        return job
+
+    @staticmethod
+    def job_levels(job):
+        """Return the DIGIPIN levels a job writes; older jobs wrote full codes only"""
+        if not job['levels']:
+            return [10]
+        return [int(level) for level in job['levels'].split(',')]
+
+    @staticmethod
+    def job_writes_key(job):
+        """Return True if a job writes the digipin_key field"""
+        return bool(job['digipin_key'])
+
+    def find_resumable_job(self, layer_id, layer_source):
+        """Return the latest job of a layer if it was canceled or interrupted, or None"""
+        job = self.latest_job(layer_id, layer_source)
+        if job is None or job['status'] not in (STATUS_RUNNING, STATUS_CANCELED):
+            return None
+        return job
+
+    def set_status(self, job_id, status):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, updated = ? WHERE job_id = ?",
+                (status, time.time(), job_id))
+
+    def commit_chunk(self, job_id, last_fid, visited, succeeded, failed, last_key=None):
+        """Record one committed chunk atomically.
+
+        last_fid advances the checkpoint (pass None when retrying failures, which
+        must not move it), visited is the number of features walked in the chunk,
+        succeeded is an iterable of fids whose earlier failures are cleared and
+        failed is a list of (fid, reason) pairs. Spatially ordered jobs also pass
+        the order key of last_fid.
+        """
+        now = time.time()
+        succeeded = list(succeeded)
+        with self.conn:
+            if last_fid is not None:
+                self.conn.execute(
+                    "UPDATE jobs SET last_fid = ?, last_key = ?, processed = processed + ?, updated = ? "
+                    "WHERE job_id = ?",
+                    (last_fid, last_key, visited, now, job_id))
+            self.conn.executemany(
+                "DELETE FROM failures WHERE job_id = ? AND fid = ?",
+                [(job_id, fid) for fid in succeeded])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO failures (job_id, fid, reason, recorded) VALUES (?, ?, ?, ?)",
+                [(job_id, fid, reason, now) for fid, reason in failed])
+
+    def failures(self, job_id):
+        """Return the (fid, reason) pairs still failing for a job, in fid order"""
+        rows = self.conn.execute(
+            "SELECT fid, reason FROM failures WHERE job_id = ? ORDER BY fid",
+            (job_id,)).fetchall()
+        return [(row['fid'], row['reason']) for row in rows]
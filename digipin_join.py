@@ -0,0 +1,99 @@
+# DIGIPIN ENCODER - A QGIS plugin for encoding and decoding DIGIPINs using India Post's API
+# Copyright (C) 2025 Beig Mehaboob
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from qgis.core import QgsGeometry, QgsPoint, QgsRectangle
+
+from . import digipin_grid
+
+
+class ZoneCellIndex:
+    """Hash index of zone polygons by the DIGIPIN cells that cover them.
+
+    Each zone is covered top-down: a cell entirely inside the zone is stored
+    as an interior cell at whatever level it is found, a cell crossing the
+    zone boundary is split further down to the index level, where it is
+    stored as a boundary cell. Cells are kept as packed keys in one hash
+    table per level. A point then matches a zone by looking up the parents of
+    its cell key; interior hits need no geometry and only boundary hits are
+    refined with an exact point-in-polygon test.
+    """
+
+    def __init__(self, level):
+        self.level = level
+        self.cells = {}
+        self.cell_count = 0
+        self.boundary_tests = 0
+        self._engines = {}
+
+    def add_zone(self, zone_id, geometry):
+        """Cover a WGS84 polygon geometry with cells and index them under zone_id"""
+        if geometry.isEmpty():
+            return
+        engine = QgsGeometry.createGeometryEngine(geometry.constGet())
+        engine.prepareGeometry()
+        bbox = geometry.boundingBox()
+
+        has_boundary = False
+        stack = [(0, 0, digipin_grid.MIN_LAT, digipin_grid.MIN_LON,
+                  digipin_grid.MAX_LAT, digipin_grid.MAX_LON)]
+        while stack:
+            key, level, min_lat, min_lon, max_lat, max_lon = stack.pop()
+            lat_div = (max_lat - min_lat) / 4
+            lon_div = (max_lon - min_lon) / 4
+            for row in range(4):
+                cell_max_lat = max_lat - lat_div * row
+                cell_min_lat = cell_max_lat - lat_div
+                if cell_min_lat > bbox.yMaximum() or cell_max_lat < bbox.yMinimum():
+                    continue
+                for col in range(4):
+                    cell_min_lon = min_lon + lon_div * col
+                    cell_max_lon = cell_min_lon + lon_div
+                    if cell_min_lon > bbox.xMaximum() or cell_max_lon < bbox.xMinimum():
+                        continue
+
+                    cell = (key << 4) | (row << 2) | col
+                    rect = QgsGeometry.fromRect(
+                        QgsRectangle(cell_min_lon, cell_min_lat, cell_max_lon, cell_max_lat))
+                    if engine.contains(rect.constGet()):
+                        self._add(level + 1, cell, zone_id, True)
+                    elif engine.intersects(rect.constGet()):
+                        if level + 1 == self.level:
+                            self._add(level + 1, cell, zone_id, False)
+                            has_boundary = True
+                        else:
+                            stack.append((cell, level + 1, cell_min_lat, cell_min_lon, cell_max_lat, cell_max_lon))
+
+        if has_boundary:
+            # The engine points into the geometry, so keep both alive
+            self._engines[zone_id] = (geometry, engine)
+
+    def _add(self, level, cell, zone_id, interior):
+        self.cells.setdefault(level, {}).setdefault(cell, []).append((zone_id, interior))
+        self.cell_count += 1
+
+    def match(self, key, lat, lon):
+        """Return the ids of the zones containing a WGS84 point whose packed key at the index level is key"""
+        matches = []
+        point = None
+        for level, cells in self.cells.items():
+            for zone_id, interior in cells.get(key >> (4 * (self.level - level)), ()):
+                if not interior:
+                    if point is None:
+                        point = QgsPoint(lon, lat)
+                    self.boundary_tests += 1
+                    if not self._engines[zone_id][1].intersects(point):
+                        continue
+                matches.append(zone_id)
+        return matches
@@ -0,0 +1,150 @@
+# DIGIPIN ENCODER - A QGIS plugin for encoding and decoding DIGIPINs using India Post's API
+# Copyright (C) 2025 Beig Mehaboob
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import math
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds of a Retry-After header (seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        delay = float(value)
+        return max(delay, 0.0) if not math.isnan(delay) else None
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateController:
+    """AIMD limit on concurrent API requests with a circuit breaker.
+
+    Each success whose latency is under target_latency grows the limit by
+    1/limit (about one request per round trip), while slow responses, 429s
+    and server errors cut it by decrease_factor, at most once per window of
+    in-flight responses. Retry-After holds back new requests for at most
+    reset_timeout seconds, and after failure_threshold consecutive failures
+    the breaker opens so callers use the local engine until a probe request
+    succeeds after reset_timeout. Other 4xx answers are neutral.
+    All methods are thread safe.
+    """
+
+    def __init__(self, min_limit=1, max_limit=16, initial_limit=4, target_latency=2.0,
+                 decrease_factor=0.5, failure_threshold=5, reset_timeout=30.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._limit = float(initial_limit)
+        self._last_decrease = 0.0
+        self._hold_until = 0.0
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def limit(self):
+        """Number of requests allowed in flight"""
+        with self._lock:
+            return int(self._limit)
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def retry_delay(self):
+        """Seconds to wait before sending a new request, as asked by Retry-After"""
+        with self._lock:
+            return max(self._hold_until - time.monotonic(), 0.0)
+
+    def allow_api(self):
+        """Return True if a request may go to the API, False if the local engine should be used"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self, latency):
+        """Record an answered request and its latency in seconds"""
+        with self._lock:
+            self._consecutive_failures = 0
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._probe_in_flight = False
+            if latency > self.target_latency:
+                self._decrease(latency)
+            else:
+                self._limit = min(self._limit + 1.0 / self._limit, self.max_limit)
+
+    def record_client_error(self):
+        """Record a 4xx response other than 429; it says nothing about the server's health"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_throttle(self, retry_after=None):
+        """Record a 429 response; the server is up but wants fewer requests"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+            self._decrease(self.target_latency)
+            self._hold(retry_after)
+
+    def record_failure(self, retry_after=None):
+        """Record a server error or connection failure"""
+        with self._lock:
+            self._decrease(self.target_latency)
+            self._hold(retry_after)
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def _decrease(self, window):
+        # Responses to a burst arrive together; only react once per window
+        now = time.monotonic()
+        if now - self._last_decrease >= window:
+            self._limit = max(self._limit * self.decrease_factor, self.min_limit)
+            self._last_decrease = now
+
+    def _hold(self, retry_after):
+        if retry_after:
+            # An absurd Retry-After must not stall requests while the breaker is closed
+            retry_after = min(retry_after, self.reset_timeout)
+            self._hold_until = max(self._hold_until, time.monotonic() + retry_after)